@@ -0,0 +1,260 @@
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from starlette.concurrency import run_in_threadpool
+
+from backend.models import ImageBlob, ImportJob, Product, ProductCreate
+from backend.stats import CatalogDelta
+
+
+logger = logging.getLogger(__name__)
+
+
+# Bulk product import and export.
+# Imports are spooled to a temp file while the request streams in. A
+# background job then parses, validates and inserts them in large batches:
+# COPY on Postgres (asyncpg) and executemany elsewhere. Bad rows are recorded
+# and skipped; they never abort the batch.
+IMPORT_FORMATS = ("csv", "jsonl")
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_BYTES = 200 * 1024 * 1024
+IMPORT_MAX_STORED_ERRORS = 1000
+IMPORT_CHUNK_SIZE = 1024 * 1024
+EXPORT_BATCH_SIZE = 1000
+
+PRODUCT_COLUMNS = ["name", "description", "price", "quantity", "image", "image_sha256", "image_size", "image_mime_type", "user_id"]
+EXPORT_COLUMNS = ["id", "name", "description", "price", "quantity", "image"]
+
+
+def import_format(requested: str, content_type: str) -> str:
+    if requested:
+        fmt = requested.lower()
+    elif "csv" in (content_type or ""):
+        fmt = "csv"
+    else:
+        fmt = "jsonl"
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format '{fmt}'")
+    return fmt
+
+
+# Stream the request body to a temp file without holding it in memory
+async def spool_request_body(request: Request) -> str:
+    handle, path = await run_in_threadpool(tempfile.mkstemp, prefix="product-import-")
+    size = 0
+    try:
+        with os.fdopen(handle, "wb") as buffer:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > IMPORT_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail="Import file is too large")
+                await run_in_threadpool(buffer.write, chunk)
+    except BaseException:
+        await run_in_threadpool(os.remove, path)
+        raise
+    return path
+
+
+def iter_records(stream, fmt: str):
+    # Yields (row number, dict or error message); row numbers are 1-based data rows
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(stream), start=1):
+            yield number, record
+        return
+
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def validate_record(record, user_id: int):
+    if isinstance(record, str):
+        return None, record
+    try:
+        product = ProductCreate.model_validate(record)
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+    if product.price < 0 or product.quantity < 0:
+        return None, "price and quantity must not be negative"
+    # The image, if any, must be an existing blob path; see acquire_import_images
+    image = record.get("image") or None
+    if image is not None and not isinstance(image, str):
+        return None, "image: must be a string"
+    return (product.name, product.description, product.price, product.quantity, image, None, None, None, user_id), None
+
+
+# Pull the next batch of validated rows as (row number, row). Runs in the
+# threadpool because parsing and validation are CPU work.
+def read_batch(records, user_id: int, size: int):
+    rows, errors, processed = [], [], 0
+    for number, record in records:
+        processed += 1
+        row, error = validate_record(record, user_id)
+        if error:
+            errors.append({"row": number, "error": error})
+        else:
+            rows.append((number, row))
+        if processed >= size:
+            break
+    return rows, errors, processed
+
+
+# Imported rows may only point at images already stored (e.g. from an
+# export). Each one takes a reference on its blob, in the batch's transaction,
+# so the file is not collected while the products use it. Unknown paths and
+# blobs already released for collection are reported as row errors.
+async def acquire_import_images(db, numbered_rows):
+    uses = {}
+    for _, row in numbered_rows:
+        if row[4] is not None:
+            uses[row[4]] = uses.get(row[4], 0) + 1
+
+    blobs = {}
+    for path in sorted(uses):
+        blob = (await db.execute(
+            update(ImageBlob)
+            .where(ImageBlob.path == path, ImageBlob.ref_count > 0)
+            .values(ref_count=ImageBlob.ref_count + uses[path])
+            .returning(ImageBlob.sha256, ImageBlob.size, ImageBlob.mime_type)
+        )).first()
+        if blob is not None:
+            blobs[path] = blob
+
+    rows, errors = [], []
+    for number, row in numbered_rows:
+        image = row[4]
+        if image is None:
+            rows.append(row)
+        elif image in blobs:
+            blob = blobs[image]
+            rows.append((*row[:5], blob.sha256, blob.size, blob.mime_type, row[8]))
+        else:
+            errors.append({"row": number, "error": f"image: unknown image '{image}'"})
+    return rows, errors
+
+
+# COPY runs on the raw connection, outside the session; the caller must have
+# executed a statement in the session first so the COPY joins its transaction
+# instead of committing on its own
+async def write_batch(db, rows):
+    if db.bind.dialect.name == "postgresql":
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table("products", records=rows, columns=PRODUCT_COLUMNS)
+    else:
+        await db.execute(insert(Product), [dict(zip(PRODUCT_COLUMNS, row)) for row in rows])
+
+    # Catalog stats for the whole batch in one delta
+    delta = CatalogDelta()
+    for row in rows:
+        delta.product(row[8], row[2], row[3])
+    await delta.apply(db)
+
+
+# Background job body. on_batch(user_id) is awaited after each committed
+# batch so caches can be refreshed.
+async def run_import_job(session_factory, job_id: int, path: str, fmt: str, user_id: int, on_batch=None):
+    stream = await run_in_threadpool(open, path, "r", encoding="utf-8-sig", newline="")
+    errors, failed, inserted, processed = [], 0, 0, 0
+    status = "failed"
+    try:
+        async with session_factory() as db:
+            await db.execute(update(ImportJob).where(ImportJob.id == job_id).values(status="running"))
+            await db.commit()
+
+        records = iter_records(stream, fmt)
+        while True:
+            numbered_rows, batch_errors, batch_processed = await run_in_threadpool(read_batch, records, user_id, IMPORT_BATCH_SIZE)
+            if not batch_processed:
+                break
+
+            async with session_factory() as db:
+                rows, image_errors = await acquire_import_images(db, numbered_rows)
+                batch_errors = sorted(batch_errors + image_errors, key=lambda error: error["row"])
+                processed += batch_processed
+                failed += len(batch_errors)
+                inserted += len(rows)
+                errors.extend(batch_errors[:IMPORT_MAX_STORED_ERRORS - len(errors)])
+
+                # Progress first: it opens the transaction the COPY then joins
+                await db.execute(
+                    update(ImportJob)
+                    .where(ImportJob.id == job_id)
+                    .values(rows_processed=processed, inserted=inserted, failed=failed, errors=json.dumps(errors))
+                )
+                if rows:
+                    await write_batch(db, rows)
+                await db.commit()
+            if rows and on_batch:
+                await on_batch(user_id)
+        status = "done"
+    except Exception as e:
+        logger.exception("Product import %s failed", job_id)
+        errors.append({"row": processed, "error": f"Import aborted: {e}"})
+    finally:
+        await run_in_threadpool(stream.close)
+        await run_in_threadpool(os.remove, path)
+        async with session_factory() as db:
+            await db.execute(
+                update(ImportJob)
+                .where(ImportJob.id == job_id)
+                .values(status=status, errors=json.dumps(errors), finished_at=datetime.utcnow())
+            )
+            await db.commit()
+
+
+def job_payload(job: ImportJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "format": job.format,
+        "rows_processed": job.rows_processed,
+        "inserted": job.inserted,
+        "failed": job.failed,
+        "errors": json.loads(job.errors) if job.errors else [],
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# Streaming export: rows are fetched with a server-side cursor in batches
+# and encoded as they go, so memory stays flat regardless of catalog size.
+# The generator opens its own session because it outlives the request handler.
+async def export_products(session_factory, fmt: str, user_id: int = None):
+    query = select(*[getattr(Product, column) for column in EXPORT_COLUMNS]).order_by(Product.id)
+    if user_id is not None:
+        query = query.where(Product.user_id == user_id)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(EXPORT_COLUMNS)
+
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            for row in rows:
+                if fmt == "csv":
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,179 @@
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from backend.serialization import COMPRESS_MIN_BYTES, accepted_encoding, compress, render_json
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is optional; the in-memory backend is the default
+    redis = None
+
+
+# Read-through response cache for catalog reads.
+# Keys embed a catalog version counter, so a write never has to find and delete
+# cached pages: it bumps the version and old entries simply stop being hit.
+RESPONSE_CACHE_MAX_ENTRIES = 5000
+RESPONSE_CACHE_TTL_SECONDS = 300
+
+
+# Backend interface. Anything shared between workers (e.g. Redis) keeps
+# versions and entries coherent across processes.
+class CacheBackend:
+    # Mixed into ETags. Counters that only live in this process restart at 0
+    # and differ between workers, so the same version number can describe
+    # different data; a per-process epoch keeps their ETags from colliding.
+    epoch = ""
+
+    async def get(self, key: str):
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        raise NotImplementedError
+
+    async def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._counters = {}
+        self.epoch = uuid.uuid4().hex
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        self._entries[key] = (value, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, url: str, prefix: str = "marketplace:"):
+        if redis is None:
+            raise RuntimeError("RedisCacheBackend requires the 'redis' package")
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await self.client.set(self.prefix + key, value, px=int(ttl_seconds * 1000))
+
+    async def get_counter(self, key: str) -> int:
+        value = await self.client.get(self.prefix + key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(self.prefix + key)
+
+
+# Version counters: one for the whole catalog, one per seller
+class CatalogVersions:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    async def catalog(self) -> int:
+        return await self.backend.get_counter("version:catalog")
+
+    async def seller(self, seller_id: int) -> int:
+        return await self.backend.get_counter(f"version:seller:{seller_id}")
+
+    # Call after every committed product write
+    async def bump(self, seller_id: int):
+        await self.bump_catalog()
+        await self.backend.incr(f"version:seller:{seller_id}")
+
+    # Catalog-wide change that is not tied to one seller (e.g. repaired totals)
+    async def bump_catalog(self):
+        await self.backend.incr("version:catalog")
+
+
+def make_etag(key: str) -> str:
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+# Cached bodies are stored already encoded for the client's Accept-Encoding,
+# prefixed with the content coding so hits never compress again
+def pack_body(body: bytes, encoding: str) -> bytes:
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return b"identity\n" + body
+    return encoding.encode() + b"\n" + compress(body, encoding)
+
+
+def unpack_body(entry: bytes):
+    coding, _, body = entry.partition(b"\n")
+    return coding.decode(), body
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    # key must include the relevant version counter(s). The ETag is derived
+    # from the key, so a matching If-None-Match is answered without touching
+    # the cache or the database. build is an async callable returning the payload.
+    async def respond(self, request: Request, key: str, build) -> Response:
+        encoding = accepted_encoding(request.headers.get("accept-encoding"))
+        key = f"{key}|{encoding or 'identity'}"
+        etag = make_etag(self.backend.epoch + key)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        entry = await self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            body = render_json(await build())
+            entry = await run_in_threadpool(pack_body, body, encoding) if encoding else pack_body(body, None)
+            await self.backend.set(key, entry, self.ttl_seconds)
+        else:
+            self.hits += 1
+
+        coding, body = unpack_body(entry)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified}
@@ -0,0 +1,162 @@
+from fastapi import HTTPException
+from sqlalchemy import delete, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import dialect_insert
+from backend.models import Cart, Product
+from backend.stats import line_demand, record_demand
+
+
+# Cart writes are single-statement upserts (INSERT ... ON CONFLICT DO UPDATE)
+# on the (user_id, product_id) primary key, so concurrent adds of the same
+# product never race and each change is one round trip. Every write also
+# updates the product_demand summary in the same transaction.
+CART_BATCH_MAX_ITEMS = 500
+
+def on_conflict(statement, mode: str):
+    # "add" accumulates onto an existing line, "set" replaces its quantity
+    if mode == "add":
+        quantity = Cart.quantity + statement.excluded.quantity
+    else:
+        quantity = statement.excluded.quantity
+    return statement.on_conflict_do_update(
+        index_elements=[Cart.user_id, Cart.product_id],
+        set_={"quantity": quantity},
+    )
+
+
+# Upsert one line. The row comes from SELECT ... FROM products, so a missing
+# product inserts nothing and is reported without a separate lookup.
+async def upsert_cart_line(db: AsyncSession, user_id: int, product_id: int, quantity: int, mode: str = "add"):
+    old = 0
+    if mode == "set":
+        old = await db.scalar(select(Cart.quantity).where(Cart.user_id == user_id, Cart.product_id == product_id)) or 0
+
+    insert = dialect_insert(db)
+    source = select(literal(user_id), Product.id, literal(quantity)).where(Product.id == product_id)
+    statement = insert(Cart).from_select(["user_id", "product_id", "quantity"], source)
+    new = (await db.execute(on_conflict(statement, mode).returning(Cart.quantity))).scalar()
+    if new is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if mode == "add":
+        old = new - quantity
+    await record_demand(db, {product_id: line_demand(old, new)})
+
+
+# Remove one line; returns False if it was not in the cart
+async def remove_cart_line(db: AsyncSession, user_id: int, product_id: int) -> bool:
+    old = (await db.execute(
+        delete(Cart).where(Cart.user_id == user_id, Cart.product_id == product_id).returning(Cart.quantity)
+    )).scalar()
+    if old is None:
+        return False
+    await record_demand(db, {product_id: line_demand(old, 0)})
+    return True
+
+
+# Fold a list of operations into one final operation per product, applied in
+# request order: remove == set 0, and add after set becomes a larger set.
+def collapse_operations(items) -> dict:
+    final = {}
+    for item in items:
+        previous = final.get(item.product_id)
+        if item.op == "remove":
+            final[item.product_id] = ("set", 0)
+        elif item.op == "set" or previous is None:
+            final[item.product_id] = (item.op, item.quantity)
+        else:
+            final[item.product_id] = (previous[0], previous[1] + item.quantity)
+    return final
+
+
+# Apply many cart operations in the caller's transaction with at most six statements
+async def apply_cart_batch(db: AsyncSession, user_id: int, items):
+    if len(items) > CART_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {CART_BATCH_MAX_ITEMS} items per batch")
+    for item in items:
+        if item.op not in ("add", "set", "remove"):
+            raise HTTPException(status_code=400, detail=f"Unknown cart operation '{item.op}'")
+        if item.op != "remove" and item.quantity < (1 if item.op == "add" else 0):
+            raise HTTPException(status_code=400, detail="Quantity must be positive")
+
+    final = collapse_operations(items)
+    removals = [product_id for product_id, (mode, quantity) in final.items() if mode == "set" and quantity == 0]
+    upserts = {
+        mode: [
+            {"user_id": user_id, "product_id": product_id, "quantity": quantity}
+            for product_id, (line_mode, quantity) in final.items()
+            if line_mode == mode and quantity > 0
+        ]
+        for mode in ("add", "set")
+    }
+
+    wanted = [row["product_id"] for rows in upserts.values() for row in rows]
+    if wanted:
+        found = set((await db.scalars(select(Product.id).where(Product.id.in_(wanted)))).all())
+        missing = sorted(set(wanted) - found)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Products not found: {missing}")
+
+    # Previous quantities of replaced lines, for the demand deltas
+    replaced = [row["product_id"] for row in upserts["set"]]
+    old = {}
+    if replaced:
+        old = dict((await db.execute(
+            select(Cart.product_id, Cart.quantity).where(Cart.user_id == user_id, Cart.product_id.in_(replaced))
+        )).all())
+
+    demand = {}
+    insert = dialect_insert(db)
+    for mode, rows in upserts.items():
+        if rows:
+            added = {row["product_id"]: row["quantity"] for row in rows}
+            result = await db.execute(on_conflict(insert(Cart).values(rows), mode).returning(Cart.product_id, Cart.quantity))
+            for product_id, new in result.all():
+                previous = new - added[product_id] if mode == "add" else old.get(product_id, 0)
+                demand[product_id] = line_demand(previous, new)
+    if removals:
+        result = await db.execute(
+            delete(Cart).where(Cart.user_id == user_id, Cart.product_id.in_(removals)).returning(Cart.product_id, Cart.quantity)
+        )
+        for product_id, previous in result.all():
+            demand[product_id] = line_demand(previous, 0)
+    await record_demand(db, demand)
+
+    return {"updated": len(wanted), "removed": len(removals)}
+
+
+# The whole cart with product details and line totals in one joined query
+async def load_cart_view(db: AsyncSession, user_id: int):
+    rows = (await db.execute(
+        select(
+            Cart.product_id,
+            Cart.quantity,
+            Product.name,
+            Product.price,
+            Product.image,
+            Product.quantity.label("stock"),
+            (Product.price * Cart.quantity).label("line_total"),
+        )
+        .join(Product, Product.id == Cart.product_id)
+        .where(Cart.user_id == user_id)
+        .order_by(Cart.product_id)
+    )).all()
+
+    items = [
+        {
+            "product_id": row.product_id,
+            "name": row.name,
+            "price": row.price,
+            "image": row.image,
+            "stock": row.stock,
+            "quantity": row.quantity,
+            "line_total": round(row.line_total, 2),
+            "available": row.stock >= row.quantity,
+        }
+        for row in rows
+    ]
+    return {
+        "items": items,
+        "total_quantity": sum(item["quantity"] for item in items),
+        "total_price": round(sum(item["line_total"] for item in items), 2),
+    }
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import re
+
+from fastapi import HTTPException
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # redis is optional; the in-memory backend is the default
+    redis = None
+
+
+logger = logging.getLogger(__name__)
+
+
+# Live catalog updates.
+# Writes publish compact change events to topics ("catalog" for everything,
+# "seller:<id>" for one seller's products). The broker fans each event out to
+# the local SSE/WebSocket subscribers of those topics. Each subscriber has a
+# bounded queue; a client that falls behind has its backlog replaced by a
+# single "resync" event instead of growing memory, and refetches.
+EVENT_QUEUE_SIZE = 256
+EVENT_MAX_SUBSCRIBERS = 10000
+EVENT_MAX_TOPICS = 20
+EVENT_HEARTBEAT_SECONDS = 15
+
+CATALOG_TOPIC = "catalog"
+TOPIC_PATTERN = re.compile(r"^(catalog|seller:\d+)$")
+
+
+def seller_topic(seller_id: int) -> str:
+    return f"seller:{seller_id}"
+
+
+def parse_topics(topics: str = None) -> set:
+    requested = {topic.strip() for topic in (topics or CATALOG_TOPIC).split(",") if topic.strip()}
+    if not requested or len(requested) > EVENT_MAX_TOPICS:
+        raise HTTPException(status_code=400, detail=f"Subscribe to between 1 and {EVENT_MAX_TOPICS} topics")
+    invalid = sorted(topic for topic in requested if not TOPIC_PATTERN.match(topic))
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {invalid}")
+    return requested
+
+
+# Backend interface. publish() sends an encoded event and its topics to every
+# worker subscribed through start(deliver), including this one.
+class EventBackend:
+    async def start(self, deliver):
+        raise NotImplementedError
+
+    async def publish(self, topics: list, message: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemoryEventBackend(EventBackend):
+    def __init__(self):
+        self._deliver = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+
+    async def publish(self, topics: list, message: str):
+        if self._deliver is not None:
+            self._deliver(topics, message)
+
+
+class RedisEventBackend(EventBackend):
+    def __init__(self, url: str, channel: str = "marketplace:events"):
+        if redis is None:
+            raise RuntimeError("RedisEventBackend requires the 'redis' package")
+        self.client = redis.from_url(url)
+        self.channel = channel
+        self._listener = None
+
+    async def start(self, deliver):
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub, deliver):
+        while True:
+            try:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=EVENT_HEARTBEAT_SECONDS)
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception:
+                logger.exception("Lost the event subscription, retrying")
+                await asyncio.sleep(1)
+                continue
+            if message is not None:
+                topics, event = json.loads(message["data"])
+                deliver(topics, event)
+
+    async def publish(self, topics: list, message: str):
+        await self.client.publish(self.channel, json.dumps([topics, message]))
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        await self.client.aclose()
+
+
+class Subscriber:
+    def __init__(self, topics: set):
+        self.topics = topics
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog and ask the client to refetch
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(encode_event({"type": "resync"}))
+
+
+def encode_event(event: dict) -> str:
+    return json.dumps(event, separators=(",", ":"), default=str)
+
+
+class EventBroker:
+    def __init__(self, backend: EventBackend):
+        self.backend = backend
+        self._subscribers = {}  # topic -> set of Subscriber
+        self.count = 0
+        self.published = 0
+        self.dropped = 0
+        self._started = False
+
+    # Started by the first subscriber, so workers nobody listens to skip it
+    async def start(self):
+        if not self._started:
+            self._started = True
+            await self.backend.start(self.deliver)
+
+    def ensure_capacity(self):
+        if self.count >= EVENT_MAX_SUBSCRIBERS:
+            raise HTTPException(status_code=503, detail="Too many live update subscribers")
+
+    async def close(self):
+        await self.backend.close()
+
+    def subscribe(self, topics: set) -> Subscriber:
+        subscriber = Subscriber(topics)
+        for topic in topics:
+            self._subscribers.setdefault(topic, set()).add(subscriber)
+        self.count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for topic in subscriber.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[topic]
+        self.count -= 1
+        self.dropped += subscriber.dropped
+
+    # Publishing never blocks on subscribers; failures are logged, not raised,
+    # because the write that triggered the event has already committed
+    async def publish(self, topics, event: dict):
+        try:
+            await self.backend.publish(list(topics), encode_event(event))
+            self.published += 1
+        except Exception:
+            logger.exception("Failed to publish %s event", event.get("type"))
+
+    def deliver(self, topics: list, message: str):
+        # A client subscribed to several of the topics still gets one copy
+        receivers = set()
+        for topic in topics:
+            receivers.update(self._subscribers.get(topic, ()))
+        for subscriber in receivers:
+            subscriber.offer(message)
+
+    async def stream(self, subscriber: Subscriber):
+        # Yields encoded events, or None after EVENT_HEARTBEAT_SECONDS of silence
+        while True:
+            try:
+                yield await asyncio.wait_for(subscriber.queue.get(), EVENT_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+
+
+def sse_frame(message: str) -> str:
+    if message is None:
+        return ": keep-alive\n\n"
+    return f"data: {message}\n\n"
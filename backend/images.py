@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from backend import storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it the original file is served
+    Image = None
+
+
+# On-demand image variants.
+# /images/<path>?w=<width>&format=<fmt> resizes and re-encodes an upload in a
+# process pool the first time it is requested, then serves it from a
+# size-capped disk cache. Widths are snapped to a fixed ladder so the number of
+# variants per image stays bounded.
+VARIANT_CACHE_FOLDER = "cache/images"
+VARIANT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+VARIANT_WIDTHS = (64, 128, 256, 480, 800, 1200, 1920)
+VARIANT_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+VARIANT_QUALITY = 80
+IMAGE_WORKERS = 2
+
+# Matches the <aa>/<bb>/<sha256>.<ext> layout used by backend.storage
+CONTENT_ADDRESSED_PATH = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z]+$")
+
+
+# Raised when an upload passed the signature check but cannot be decoded
+class UnreadableImage(Exception):
+    pass
+
+
+if Image is not None:
+    DECODE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+else:
+    DECODE_ERRORS = (OSError, ValueError)
+
+
+def snap_width(width: int) -> int:
+    for candidate in VARIANT_WIDTHS:
+        if width <= candidate:
+            return candidate
+    return VARIANT_WIDTHS[-1]
+
+
+def resolve_source(image_path: str) -> str:
+    # Read at call time so a relocated upload folder (e.g. the bench) is honoured
+    root = os.path.realpath(storage.UPLOAD_FOLDER)
+    source = os.path.realpath(os.path.join(root, image_path))
+    if not source.startswith(root + os.sep):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return source
+
+
+# Runs in a worker process
+def render_variant(source: str, destination: str, width: int, fmt: str):
+    temp_path = f"{destination}.{uuid.uuid4().hex}.tmp"
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            if width and image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            options = {"quality": VARIANT_QUALITY} if fmt in ("jpeg", "webp") else {"optimize": True}
+            image.save(temp_path, format=fmt.upper(), **options)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, destination)
+    return os.path.getsize(destination)
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+# Disk cache of rendered variants with least-recently-used eviction.
+# The index lives in memory and is rebuilt from the directory on startup.
+class VariantCache:
+    def __init__(self, folder: str = VARIANT_CACHE_FOLDER, max_bytes: int = VARIANT_CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> size, oldest first
+        self._pending = {}  # key -> future of an in-flight render
+        self._leases = {}  # key -> number of requests reading the file
+        self._unreadable = set()  # keys whose source could not be decoded
+        self._executor = None
+        self._loaded = False
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.folder, key[:2], key)
+
+    def _load(self):
+        found = []
+        for directory, _, files in os.walk(self.folder):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                stat = os.stat(os.path.join(directory, name))
+                found.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.total_bytes += size
+
+    # Bytes of the variant. The entry is leased while its file is read, so an
+    # eviction triggered by another render cannot delete it underneath.
+    # Raises UnreadableImage if the source cannot be decoded.
+    async def read(self, key: str, source: str, width: int, fmt: str) -> bytes:
+        path = await self.get(key, source, width, fmt)
+        self._leases[key] = self._leases.get(key, 0) + 1
+        try:
+            return await run_in_threadpool(read_file, path)
+        finally:
+            self._leases[key] -= 1
+            if not self._leases[key]:
+                del self._leases[key]
+
+    async def get(self, key: str, source: str, width: int, fmt: str) -> str:
+        if key in self._unreadable:
+            raise UnreadableImage(source)
+        if not self._loaded:
+            await run_in_threadpool(self._load)
+            self._loaded = True
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self.path_for(key)
+
+        # Concurrent requests for the same variant share one render
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render(key, source, width, fmt))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        await asyncio.shield(pending)
+        return self.path_for(key)
+
+    async def _render(self, key: str, source: str, width: int, fmt: str):
+        destination = self.path_for(key)
+        await run_in_threadpool(os.makedirs, os.path.dirname(destination), exist_ok=True)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        loop = asyncio.get_running_loop()
+        try:
+            size = await loop.run_in_executor(self._executor, render_variant, source, destination, width, fmt)
+        except DECODE_ERRORS as e:
+            # Remembered so a broken upload is not re-decoded on every request
+            self._unreadable.add(key)
+            raise UnreadableImage(source) from e
+
+        self._entries[key] = size
+        self.total_bytes += size
+        await self._evict(keep=key)
+
+    async def _evict(self, keep: str):
+        victims = []
+        for key, size in list(self._entries.items()):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == keep or key in self._leases:
+                continue
+            del self._entries[key]
+            self.total_bytes -= size
+            victims.append(self.path_for(key))
+
+        def remove_all():
+            for path in victims:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+        if victims:
+            await run_in_threadpool(remove_all)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def variant_key(image_path: str, stat: os.stat_result, width: int, fmt: str) -> str:
+    # Size and mtime are part of the key so a replaced legacy file gets new variants
+    raw = f"{image_path}:{stat.st_size}:{stat.st_mtime_ns}:{width}:{fmt}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cache_control_for(image_path: str) -> str:
+    # Content-addressed files never change, so their variants can be cached forever
+    if CONTENT_ADDRESSED_PATH.match(image_path):
+        return "public, max-age=31536000, immutable"
+    return "public, max-age=3600"
+
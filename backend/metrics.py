@@ -0,0 +1,240 @@
+import bisect
+import contextvars
+import logging
+import re
+import time
+from collections import Counter as Tally
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+
+# Per-request performance instrumentation.
+# A middleware opens a RequestStats for each request and SQLAlchemy cursor
+# events add every statement's count, time and rows to it. When the request
+# ends the totals go into Prometheus histograms served at /metrics. The
+# per-statement cost is two perf_counter calls and a dict increment, so this
+# stays on in production.
+
+SLOW_REQUEST_SECONDS = 1.0
+SLOW_LOG_MAX_STATEMENTS = 50
+N_PLUS_ONE_THRESHOLD = 5  # Same statement shape this many times in one request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in sorted(self._values.items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *label_values):
+        series = self._values.get(label_values)
+        if series is None:
+            series = self._values[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self):
+        names = self.labels + ("le",)
+        for label_values, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{format_labels(names, label_values + (bound,))} {cumulative}"
+            yield f"{self.name}_bucket{format_labels(names, label_values + ('+Inf',))} {series[-1]}"
+            yield f"{self.name}_sum{format_labels(self.labels, label_values)} {series[-2]}"
+            yield f"{self.name}_count{format_labels(self.labels, label_values)} {series[-1]}"
+
+
+# Values read at scrape time from a callback returning {label values: value},
+# for state that other modules already keep (cache hit counts, pool sizes)
+class CallbackMetric:
+    def __init__(self, name: str, help: str, read, labels=(), kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.read = read
+        self.kind = kind
+
+    def samples(self):
+        for label_values, value in sorted(self.read().items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in the database per request", ("method", "route")))
+request_statements = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements per request", ("method", "route"), STATEMENT_BUCKETS))
+request_rows = registry.register(Histogram(
+    "http_request_db_rows", "Rows returned or affected per request", ("method", "route"), ROW_BUCKETS))
+n_plus_one_total = registry.register(Counter(
+    "http_request_n_plus_one_total", "Requests that repeated one statement shape many times", ("method", "route")))
+slow_requests_total = registry.register(Counter(
+    "http_slow_requests_total", f"Requests slower than {SLOW_REQUEST_SECONDS}s", ("method", "route")))
+background_statements = registry.register(Counter(
+    "db_background_statements_total", "SQL statements issued outside a request"))
+background_db_seconds = registry.register(Counter(
+    "db_background_seconds_total", "Database time spent outside a request"))
+
+
+class RequestStats:
+    __slots__ = ("started", "statements", "db_seconds", "rows", "seen", "log", "finished", "_statement_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.seen = Tally()  # statement text -> executions
+        self.log = []  # (seconds, sql) for the slow-request log
+        # Set once the response is sent; later SQL (background tasks) is background work
+        self.finished = False
+        self._statement_started = 0.0
+
+
+current_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def active_stats():
+    stats = current_stats.get()
+    return None if stats is None or stats.finished else stats
+
+# Placeholders and IN lists vary with the parameters; fold them so the same
+# query with different ids counts as one shape
+PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|:\w+|\?")
+PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    return PLACEHOLDER_LIST.sub("(?)", PLACEHOLDER.sub("?", statement))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = active_stats()
+    if stats is not None:
+        stats._statement_started = time.perf_counter()
+    else:
+        conn.info["metrics_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = active_stats()
+    if stats is None:
+        started = conn.info.pop("metrics_started", None)
+        background_statements.inc()
+        if started is not None:
+            background_db_seconds.inc(amount=time.perf_counter() - started)
+        return
+
+    elapsed = time.perf_counter() - stats._statement_started
+    stats.statements += 1
+    stats.db_seconds += elapsed
+    stats.seen[statement] += 1
+    # rowcount is -1 for SELECT; the async drivers buffer the fetched rows
+    rows = cursor.rowcount
+    if rows is None or rows < 0:
+        rows = len(getattr(cursor, "_rows", None) or ())
+    stats.rows += rows
+    if len(stats.log) < SLOW_LOG_MAX_STATEMENTS:
+        stats.log.append((elapsed, statement))
+
+
+def route_label(scope) -> str:
+    # Templated path so ids do not explode the label set
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def record_request(scope, method: str, status: int, stats: RequestStats):
+    elapsed = time.perf_counter() - stats.started
+    route = route_label(scope)
+
+    requests_total.inc(method, route, status)
+    request_duration.observe(elapsed, method, route)
+    request_db_seconds.observe(stats.db_seconds, method, route)
+    request_statements.observe(stats.statements, method, route)
+    request_rows.observe(stats.rows, method, route)
+
+    repeated = {}
+    if stats.statements >= N_PLUS_ONE_THRESHOLD:
+        shapes = Tally()
+        for statement, count in stats.seen.items():
+            shapes[statement_shape(statement)] += count
+        repeated = {shape: count for shape, count in shapes.items() if count >= N_PLUS_ONE_THRESHOLD}
+    if repeated:
+        n_plus_one_total.inc(method, route)
+        for shape, count in repeated.items():
+            logger.warning("Possible N+1 on %s %s: %d x %s", method, route, count, shape[:200])
+
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        slow_requests_total.inc(method, route)
+        statements = "\n".join(f"  {seconds * 1000:8.1f} ms  {sql[:500]}" for seconds, sql in stats.log)
+        logger.warning(
+            "Slow request %s %s: %.3fs, %d statements, %.3fs in database, %d rows\n%s",
+            method, route, elapsed, stats.statements, stats.db_seconds, stats.rows, statements,
+        )
@@ -1,8 +1,10 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, DDL, event, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
 
 Base = declarative_base()
 
@@ -16,9 +18,61 @@ class Product(Base):
     price = Column(Float, nullable=False)
     quantity = Column(Integer, nullable=False)
     image = Column(String, nullable=True)  # Add this line
+    image_sha256 = Column(String(64), ForeignKey("image_blobs.sha256"), index=True, nullable=True)
+    image_size = Column(Integer, nullable=True)
+    image_mime_type = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="products")
 
+    __table_args__ = (
+        # Composite index used by keyset pagination when sorting by price
+        Index("ix_products_price_id", "price", "id"),
+        # Per-seller listings and the stats reconciler
+        Index("ix_products_user_id", "user_id"),
+        # Full-text and trigram indexes used by /products/search on Postgres.
+        # The expression must match SEARCH_DOCUMENT in backend/search.py.
+        Index(
+            "ix_products_search_document",
+            text("to_tsvector('english', name || ' ' || description)"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+# pg_trgm provides the % similarity operator used for typo-tolerant matching
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+# On SQLite (local testing) search uses an FTS5 index kept in sync by triggers
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, content='products', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -33,6 +87,63 @@ class User(Base):
     cart_items = relationship("Cart", back_populates="user")
 
 
+# Content-addressed image file shared by every product that uploaded the same bytes
+class ImageBlob(Base):
+    __tablename__ = "image_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    mime_type = Column(String, nullable=False)
+    path = Column(String, nullable=False)  # Relative to static/uploads
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# An order created at checkout. Stock is reserved while status is "reserved"
+# and returned to the products if the order expires or is cancelled.
+class Order(Base):
+    __tablename__ = "orders"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="reserved")  # reserved, paid, expired, cancelled
+    total_price = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    items = relationship("OrderItem", back_populates="order")
+
+    # Lets the reservation reaper find expired orders without a scan
+    __table_args__ = (Index("ix_orders_status_expires_at", "status", "expires_at"),)
+
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True)
+    seller_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=False)  # Price at checkout time
+    order = relationship("Order", back_populates="items")
+
+
+# Background bulk product import; progress is updated after every batch
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, failed
+    format = Column(String, nullable=False)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    errors = Column(String, nullable=True)  # JSON list of {"row", "error"}, capped
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+
 class Cart(Base):
     __tablename__ = "cart"
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
@@ -43,6 +154,61 @@ class Cart(Base):
     product = relationship("Product")
 
 
+# Summary tables maintained by backend/stats.py in the same transaction as
+# each product, stock or cart write, and repaired by its reconciler.
+class SellerStats(Base):
+    __tablename__ = "seller_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    product_count = Column(Integer, nullable=False, default=0)
+    stock_units = Column(Integer, nullable=False, default=0)
+    stock_value = Column(Float, nullable=False, default=0.0)
+    in_stock_count = Column(Integer, nullable=False, default=0)
+
+
+# Catalog totals are spread over a few shard rows so concurrent writes do not
+# all queue on one row; readers sum the shards.
+class CatalogStats(Base):
+    __tablename__ = "catalog_stats"
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    product_count = Column(Integer, nullable=False, default=0)
+    stock_units = Column(Integer, nullable=False, default=0)
+    stock_value = Column(Float, nullable=False, default=0.0)
+    in_stock_count = Column(Integer, nullable=False, default=0)
+
+
+class ProductDemand(Base):
+    __tablename__ = "product_demand"
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    seller_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    cart_units = Column(Integer, nullable=False, default=0)  # Units sitting in carts
+    cart_count = Column(Integer, nullable=False, default=0)  # Carts holding the product
+
+    __table_args__ = (
+        # Top products by demand for a seller's dashboard
+        Index("ix_product_demand_seller_units", "seller_id", "cart_units"),
+    )
+
+
+
+# Response models for the stats endpoints
+class ProductDemandResponse(BaseModel):
+    product_id: int
+    cart_units: int
+    cart_count: int
+
+class SellerStatsResponse(BaseModel):
+    user_id: int
+    product_count: int
+    stock_units: int
+    stock_value: float
+    in_stock_count: int
+    top_demand: list[ProductDemandResponse]
+
+class CatalogStatsResponse(BaseModel):
+    product_count: int
+    stock_units: int
+    stock_value: float
+    in_stock_count: int
 
 # Response model for products
 class ProductResponse(BaseModel):
@@ -51,12 +217,63 @@ class ProductResponse(BaseModel):
     description: str
     price: float
     quantity: int
-    image: str
+    image: Optional[str] = None
     full_address: str
 
     class Config:
         from_attributes = True
 
+# Response model for one page of products (keyset pagination)
+class ProductPage(BaseModel):
+    items: list[ProductResponse]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_pages: Optional[int] = None
+
+# Response models for /products/search
+class PriceBucket(BaseModel):
+    min_price: float
+    max_price: Optional[float] = None
+    count: int
+
+class SearchFacets(BaseModel):
+    price: list[PriceBucket]
+    in_stock: int
+
+class ProductSearchPage(BaseModel):
+    items: list[ProductResponse]
+    total: Optional[int] = None  # None when it could not be counted in time
+    facets: Optional[SearchFacets] = None
+
+# Response models for checkout
+class OrderItemResponse(BaseModel):
+    product_id: Optional[int] = None
+    quantity: int
+    unit_price: float
+
+class OrderResponse(BaseModel):
+    id: int
+    status: str
+    total_price: float
+    expires_at: datetime
+    items: list[OrderItemResponse]
+
+# Response models for bulk import jobs
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportJobResponse(BaseModel):
+    id: int
+    status: str
+    format: str
+    rows_processed: int
+    inserted: int
+    failed: int
+    errors: list[ImportRowError]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
 # Schema for creating a product
 class ProductCreate(BaseModel):
     name: str
@@ -80,4 +297,29 @@ class LoginRequest(BaseModel):
 # Pydantic model for cart actions
 class CartAction(BaseModel):
     product_id: int
-    quantity: int
\ No newline at end of file
+    quantity: int
+
+# One operation of a batch cart update: op is "add", "set" or "remove"
+class CartBatchItem(BaseModel):
+    product_id: int
+    quantity: int = 0
+    op: str = "add"
+
+class CartBatch(BaseModel):
+    items: list[CartBatchItem]
+
+# Cart line joined with its product
+class CartLine(BaseModel):
+    product_id: int
+    name: str
+    price: float
+    image: Optional[str] = None
+    stock: int
+    quantity: int
+    line_total: float
+    available: bool
+
+class CartView(BaseModel):
+    items: list[CartLine]
+    total_quantity: int
+    total_price: float
\ No newline at end of file
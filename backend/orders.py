@@ -0,0 +1,184 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import Cart, Order, OrderItem, Product
+from backend.stats import CatalogDelta, line_demand, record_demand
+
+
+logger = logging.getLogger(__name__)
+
+
+# Checkout with stock reservation.
+# Each cart line takes its stock with a conditional
+#     UPDATE products SET quantity = quantity - n WHERE id = :id AND quantity >= n
+# which is atomic per row, so stock can never go negative however many buyers
+# race for it. Lines are reserved in product id order so two checkouts that
+# share products lock rows in the same order and cannot deadlock.
+RESERVATION_TTL = timedelta(minutes=15)
+REAPER_INTERVAL_SECONDS = 30
+REAPER_BATCH_SIZE = 100
+
+
+# One product's stock after a reservation or release, for cache
+# invalidation and live updates
+def stock_change(product_id: int, seller_id: int, quantity: int) -> dict:
+    return {"product_id": product_id, "seller_id": seller_id, "quantity": quantity}
+
+
+def order_payload(order: Order, items) -> dict:
+    return {
+        "id": order.id,
+        "status": order.status,
+        "total_price": order.total_price,
+        "expires_at": order.expires_at,
+        "items": [
+            {"product_id": item["product_id"], "quantity": item["quantity"], "unit_price": item["unit_price"]}
+            for item in items
+        ],
+    }
+
+
+# Turn the user's cart into a reserved order in the caller's transaction.
+# Returns the order payload and the stock changes (see stock_change).
+async def checkout_cart(db: AsyncSession, user_id: int):
+    lines = (await db.execute(
+        select(Cart.product_id, Cart.quantity)
+        .where(Cart.user_id == user_id, Cart.quantity > 0)
+        .order_by(Cart.product_id)
+    )).all()
+    if not lines:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    items, changes = [], []
+    delta = CatalogDelta()
+    for product_id, quantity in lines:
+        reserved = (await db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.quantity >= quantity)
+            .values(quantity=Product.quantity - quantity)
+            .returning(Product.price, Product.user_id, Product.quantity)
+        )).first()
+        if reserved is None:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail=f"Not enough stock for product {product_id}")
+        items.append({
+            "product_id": product_id,
+            "seller_id": reserved.user_id,
+            "quantity": quantity,
+            "unit_price": reserved.price,
+        })
+        changes.append(stock_change(product_id, reserved.user_id, reserved.quantity))
+        delta.stock(reserved.user_id, reserved.price, reserved.quantity + quantity, reserved.quantity)
+
+    now = datetime.utcnow()
+    order = Order(
+        user_id=user_id,
+        status="reserved",
+        total_price=round(sum(item["unit_price"] * item["quantity"] for item in items), 2),
+        created_at=now,
+        expires_at=now + RESERVATION_TTL,
+    )
+    db.add(order)
+    await db.flush()
+
+    await db.execute(insert(OrderItem), [{"order_id": order.id, **item} for item in items])
+    # Remove only the lines that were ordered, as they were read; a line added
+    # or changed by a concurrent cart write stays in the cart
+    emptied = await db.execute(
+        delete(Cart)
+        .where(Cart.user_id == user_id)
+        .where(or_(tuple_(Cart.product_id, Cart.quantity).in_([tuple(line) for line in lines]), Cart.quantity <= 0))
+        .returning(Cart.product_id, Cart.quantity)
+    )
+    await record_demand(db, {product_id: line_demand(quantity, 0) for product_id, quantity in emptied.all()})
+    await delta.apply(db)
+    return order_payload(order, items), changes
+
+
+# Mark a reserved order as paid. The status check makes payment and expiry
+# mutually exclusive: whichever UPDATE runs first wins.
+async def pay_order(db: AsyncSession, order_id: int, user_id: int):
+    paid = (await db.execute(
+        update(Order)
+        .where(
+            Order.id == order_id,
+            Order.user_id == user_id,
+            Order.status == "reserved",
+            Order.expires_at > datetime.utcnow(),
+        )
+        .values(status="paid")
+        .returning(Order.id)
+    )).first()
+    if paid is None:
+        raise HTTPException(status_code=409, detail="Order is not awaiting payment")
+
+
+# Move a reserved order to new_status and put its stock back.
+# Returns the stock changes, or None if the order was no longer reserved.
+async def release_order(db: AsyncSession, order_id: int, new_status: str, user_id: int = None):
+    condition = [Order.id == order_id, Order.status == "reserved"]
+    if user_id is not None:
+        condition.append(Order.user_id == user_id)
+    released = (await db.execute(
+        update(Order).where(*condition).values(status=new_status).returning(Order.id)
+    )).first()
+    if released is None:
+        return None
+
+    items = (await db.execute(
+        select(OrderItem.product_id, OrderItem.quantity)
+        .where(OrderItem.order_id == order_id, OrderItem.product_id.is_not(None))
+        .order_by(OrderItem.product_id)
+    )).all()
+    changes = []
+    delta = CatalogDelta()
+    for product_id, quantity in items:
+        restored = (await db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(quantity=Product.quantity + quantity)
+            .returning(Product.user_id, Product.price, Product.quantity)
+        )).first()
+        if restored is not None:
+            changes.append(stock_change(product_id, restored.user_id, restored.quantity))
+            delta.stock(restored.user_id, restored.price, restored.quantity - quantity, restored.quantity)
+    await delta.apply(db)
+    return changes
+
+
+# Release every reservation that passed its deadline.
+# Each order is released in its own transaction; on_stock_change is awaited
+# with the stock changes after each commit.
+async def release_expired_orders(session_factory, on_stock_change=None) -> int:
+    async with session_factory() as db:
+        expired = (await db.scalars(
+            select(Order.id)
+            .where(Order.status == "reserved", Order.expires_at <= datetime.utcnow())
+            .order_by(Order.expires_at)
+            .limit(REAPER_BATCH_SIZE)
+        )).all()
+
+    released = 0
+    for order_id in expired:
+        async with session_factory() as db:
+            changes = await release_order(db, order_id, "expired")
+            await db.commit()
+        if changes is not None:
+            released += 1
+            if on_stock_change:
+                await on_stock_change(changes)
+    return released
+
+
+async def reap_expired_orders_forever(session_factory, on_stock_change=None, interval: float = REAPER_INTERVAL_SECONDS):
+    while True:
+        try:
+            await release_expired_orders(session_factory, on_stock_change)
+        except Exception:
+            logger.exception("Failed to release expired reservations")
+        await asyncio.sleep(interval)
@@ -0,0 +1,92 @@
+import base64
+import json
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+from backend.models import Product
+
+
+# Sort options for keyset pagination. Every option ends with Product.id so the
+# ordering is total and a cursor always points at exactly one row.
+# "newest" uses the primary key, which grows with insertion order.
+SORT_OPTIONS = {
+    "newest": ((Product.id,), True),
+    "oldest": ((Product.id,), False),
+    "price_asc": ((Product.price, Product.id), False),
+    "price_desc": ((Product.price, Product.id), True),
+}
+
+DEFAULT_SORT = "newest"
+
+
+def encode_cursor(sort: str, values) -> str:
+    raw = json.dumps([sort, *values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    columns, _ = SORT_OPTIONS[sort]
+    if not isinstance(data, list) or len(data) != len(columns) + 1 or data[0] != sort:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+
+    # Values go straight into the query, so each must match its column's type
+    # (an int is accepted for a float column; bools are not numbers here)
+    for column, value in zip(columns, data[1:]):
+        expected = (int, float) if column.type.python_type is float else column.type.python_type
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return data[1:]
+
+
+def cursor_values(sort: str, product) -> list:
+    columns, _ = SORT_OPTIONS[sort]
+    return [getattr(product, column.key) for column in columns]
+
+
+# Apply ordering and the "after cursor" predicate to a Product query.
+# The row-value comparison lets the database walk the (price, id) / id index
+# straight to the first row of the page instead of skipping over OFFSET rows.
+def apply_keyset(query, sort: str, after: str = None):
+    if sort not in SORT_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort '{sort}'")
+
+    columns, descending = SORT_OPTIONS[sort]
+    if after:
+        values = decode_cursor(after, sort)
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        bound = tuple_(*values) if len(columns) > 1 else values[0]
+        query = query.filter(key < bound if descending else key > bound)
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    return query.order_by(*ordering)
+
+
+# Small TTL cache for the product count so listing pages and /total_pages
+# do not run a full COUNT(*) on every request.
+class CountCache:
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self._value = None
+        self._expires_at = 0.0
+
+    # compute is a zero-argument callable returning an awaitable
+    async def get(self, compute):
+        now = time.monotonic()
+        if self._value is not None and now < self._expires_at:
+            return self._value
+        value = await compute()
+        self._value = value
+        self._expires_at = now + self.ttl_seconds
+        return value
+
+    def invalidate(self):
+        self._value = None
+        self._expires_at = 0.0
@@ -0,0 +1,70 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+
+# Password hashing
+# Cost used for new hashes. Hashes made with another cost are flagged by
+# needs_update and transparently rehashed on the next successful login.
+BCRYPT_ROUNDS = 12
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt runs in its own processes so a login burst cannot starve request
+# handling. Work beyond workers + queue limit is refused instead of queued.
+# Both can be overridden from the environment.
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get("PASSWORD_QUEUE_LIMIT", 32))
+
+
+def get_password_hash(password):
+    return pwd_context.hash(password)
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+# Returns (valid, new_hash); new_hash is set when the stored hash should be upgraded
+def verify_and_update_password(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+
+class PasswordPool:
+    def __init__(self, max_workers: int = PASSWORD_WORKERS, queue_limit: int = PASSWORD_QUEUE_LIMIT):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = None
+
+    async def _submit(self, fn, *args):
+        if self.in_flight >= self.max_workers + self.queue_limit:
+            self.rejected += 1
+            raise PasswordPoolSaturated()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(get_password_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        return await self._submit(verify_and_update_password, password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool()
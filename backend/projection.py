@@ -0,0 +1,52 @@
+from fastapi import HTTPException
+
+from backend.models import Product, User
+
+
+# Sparse fieldsets for product listings.
+# ?fields=name,price selects just those columns (plus id) from the database
+# and returns rows as plain dicts, so no ORM entities are built and nothing is
+# validated twice. The users table is joined only when full_address is asked for.
+PRODUCT_FIELDS = {
+    "id": Product.id,
+    "name": Product.name,
+    "description": Product.description,
+    "price": Product.price,
+    "quantity": Product.quantity,
+    "image": Product.image,
+    "full_address": User.full_address,
+}
+
+
+def parse_fields(fields: str = None) -> tuple:
+    if not fields:
+        return tuple(PRODUCT_FIELDS)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - PRODUCT_FIELDS.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}")
+    requested.add("id")
+    return tuple(name for name in PRODUCT_FIELDS if name in requested)
+
+
+# Labeled columns for the requested fields, followed by any extra columns the
+# caller needs (e.g. the keyset sort keys) that were not requested
+def product_columns(fields: tuple, extra=()) -> list:
+    columns = [PRODUCT_FIELDS[name].label(name) for name in fields]
+    columns += [column.label(column.key) for column in extra if column.key not in fields]
+    return columns
+
+
+def needs_user(fields: tuple) -> bool:
+    return "full_address" in fields
+
+
+def join_user(query, fields: tuple):
+    if needs_user(fields):
+        return query.join(User, Product.user_id == User.id)
+    return query
+
+
+def row_dicts(rows, fields: tuple) -> list:
+    # Extra columns come after the requested ones, so zip drops them
+    return [dict(zip(fields, row)) for row in rows]
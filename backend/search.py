@@ -0,0 +1,172 @@
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, column, func, literal, literal_column, or_, select, table, text, true
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import Product
+from backend.projection import PRODUCT_FIELDS, join_user, product_columns, row_dicts
+from backend.stats import catalog_product_count
+
+
+# Product search for /products/search.
+# Postgres matches with the GIN full-text index (prefix terms) plus pg_trgm
+# similarity on the name for typos. SQLite uses the products_fts FTS5 table.
+# Any other database falls back to a LIKE scan.
+SEARCH_SORTS = ("relevance", "price_asc", "price_desc", "newest")
+SEARCH_MAX_OFFSET = 1000
+SEARCH_MAX_TERMS = 8
+SEARCH_TIMEOUT_MS = 500
+
+# SQLSTATE of a statement cancelled by statement_timeout (QueryCanceledError)
+QUERY_CANCELED = "57014"
+
+# Facet buckets as (min, max); the last bucket is open-ended
+PRICE_BUCKETS = [(0, 10), (10, 50), (50, 100), (100, 500), (500, None)]
+
+# Must match the ix_products_search_document expression in backend/models.py
+SEARCH_DOCUMENT = literal_column("to_tsvector('english', products.name || ' ' || products.description)")
+products_fts = table("products_fts", column("rowid"), column("rank"))
+
+
+# Only a statement-timeout cancellation is the latency-budget case; any other
+# database error is a real failure and propagates
+def is_statement_timeout(error: DBAPIError) -> bool:
+    code = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None)
+    return code == QUERY_CANCELED
+
+
+def search_terms(q: str) -> list[str]:
+    return re.findall(r"\w+", (q or "").lower())[:SEARCH_MAX_TERMS]
+
+
+# Add the text match for the current database.
+# Returns the query and a relevance expression where higher is better.
+def apply_text_match(query, dialect: str, q: str, terms: list[str]):
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery(literal_column("'english'"), " & ".join(f"{term}:*" for term in terms))
+        query = query.where(or_(SEARCH_DOCUMENT.op("@@")(tsquery), Product.name.op("%")(q)))
+        return query, func.ts_rank_cd(SEARCH_DOCUMENT, tsquery) + func.similarity(Product.name, q)
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        query = query.join(products_fts, products_fts.c.rowid == Product.id).where(
+            text("products_fts MATCH :fts_query").bindparams(fts_query=match)
+        )
+        # bm25 rank: lower is better
+        return query, -products_fts.c.rank
+
+    conditions = [
+        or_(Product.name.ilike(f"%{term}%"), Product.description.ilike(f"%{term}%"))
+        for term in terms
+    ]
+    return query.where(*conditions), literal(0)
+
+
+def price_condition(min_price, max_price):
+    conditions = []
+    if min_price is not None:
+        conditions.append(Product.price >= min_price)
+    if max_price is not None:
+        conditions.append(Product.price <= max_price)
+    return and_(*conditions) if conditions else true()
+
+
+def apply_filters(query, min_price, max_price, in_stock: bool):
+    query = query.where(price_condition(min_price, max_price))
+    if in_stock:
+        query = query.where(Product.quantity > 0)
+    return query
+
+
+def order_for(sort: str, relevance):
+    if sort == "relevance":
+        return [relevance.desc(), Product.id.desc()]
+    if sort == "price_asc":
+        return [Product.price.asc(), Product.id.asc()]
+    if sort == "price_desc":
+        return [Product.price.desc(), Product.id.desc()]
+    return [Product.id.desc()]
+
+
+def bucket_condition(low, high):
+    if high is None:
+        return Product.price >= low
+    return (Product.price >= low) & (Product.price < high)
+
+
+async def run_search(
+    db: AsyncSession,
+    q: str = None,
+    min_price: float = None,
+    max_price: float = None,
+    in_stock: bool = False,
+    sort: str = "relevance",
+    limit: int = 20,
+    offset: int = 0,
+    fields: tuple = tuple(PRODUCT_FIELDS),
+):
+    if sort not in SEARCH_SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort '{sort}'")
+
+    dialect = db.bind.dialect.name
+    terms = search_terms(q)
+    if not terms and sort == "relevance":
+        sort = "newest"
+
+    # Keep slow searches from holding a connection past the latency budget
+    if dialect == "postgresql":
+        await db.execute(text(f"SET LOCAL statement_timeout = {SEARCH_TIMEOUT_MS}"))
+
+    query = join_user(select(*product_columns(fields)).select_from(Product), fields)
+    relevance = literal(0)
+    if terms:
+        query, relevance = apply_text_match(query, dialect, q, terms)
+    query = apply_filters(query, min_price, max_price, in_stock)
+    query = query.order_by(*order_for(sort, relevance)).limit(limit).offset(offset)
+
+    try:
+        rows = (await db.execute(query)).all()
+    except DBAPIError as e:
+        if not is_statement_timeout(e):
+            raise
+        raise HTTPException(status_code=503, detail="Search took too long, try a narrower query")
+    items = row_dicts(rows, fields)
+
+    # Without a text term the facets would aggregate the whole catalog on every
+    # search, so skip them; an unfiltered total comes from the catalog stats
+    if not terms:
+        unfiltered = min_price is None and max_price is None and not in_stock
+        total = await catalog_product_count(db) if unfiltered else None
+        return {"items": items, "total": total, "facets": None}
+
+    # Total and facets in one aggregate pass. Price buckets ignore the price
+    # filter so the client can show what widening the range would return.
+    facet_query = select(
+        func.count(Product.id),
+        func.sum(case((price_condition(min_price, max_price), 1), else_=0)),
+        func.sum(case((Product.quantity > 0, 1), else_=0)),
+        *[func.sum(case((bucket_condition(low, high), 1), else_=0)) for low, high in PRICE_BUCKETS],
+    ).select_from(Product)
+    facet_query, _ = apply_text_match(facet_query, dialect, q, terms)
+    facet_query = apply_filters(facet_query, None, None, in_stock)
+
+    try:
+        async with db.begin_nested():
+            counts = (await db.execute(facet_query)).one()
+    except DBAPIError as e:
+        if not is_statement_timeout(e):
+            raise
+        # Facets are best effort; return the results even if counting timed out
+        return {"items": items, "total": None, "facets": None}
+
+    _, total, in_stock_count, *bucket_counts = counts
+    facets = {
+        "price": [
+            {"min_price": low, "max_price": high, "count": count or 0}
+            for (low, high), count in zip(PRICE_BUCKETS, bucket_counts)
+        ],
+        "in_stock": in_stock_count or 0,
+    }
+    return {"items": items, "total": total or 0, "facets": facets}
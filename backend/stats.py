@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import random
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import dialect_insert
+from backend.models import Cart, CatalogStats, Product, ProductDemand, SellerStats, User
+
+
+logger = logging.getLogger(__name__)
+
+
+# Incrementally maintained catalog aggregates.
+# Every write that changes products, stock or carts adds its delta to the
+# summary tables in the same transaction, so /users/{id}/stats and
+# /catalog/stats read a handful of rows instead of scanning products and carts.
+# A periodic reconciler recomputes the aggregates and repairs any drift
+# (float rounding, writes made outside the app).
+CATALOG_STATS_SHARDS = 16
+TOP_DEMAND_LIMIT = 5
+RECONCILE_INTERVAL_SECONDS = 600
+RECONCILE_BATCH_SIZE = 500
+
+STAT_FIELDS = ("product_count", "stock_units", "stock_value", "in_stock_count")
+
+# Rows written before the summary tables existed are only counted once a
+# reconcile pass has backfilled them, so until the first pass in this process
+# completes, catalog totals are aggregated from products directly
+backfilled = False
+
+
+# Collects product/stock deltas per seller during a write, then applies them
+# with one upsert per seller and one catalog shard update. Call apply() as the
+# last statement before commit so locks are always taken in the same order:
+# products, cart, product_demand, seller_stats, catalog_stats.
+class CatalogDelta:
+    def __init__(self):
+        self.by_seller = {}  # seller id -> [products, units, value, in stock]
+
+    def _add(self, seller_id: int, products: int, units: int, value: float, in_stock: int):
+        totals = self.by_seller.setdefault(seller_id, [0, 0, 0.0, 0])
+        totals[0] += products
+        totals[1] += units
+        totals[2] += value
+        totals[3] += in_stock
+
+    # A product was created (sign=1) or deleted (sign=-1)
+    def product(self, seller_id: int, price: float, quantity: int, sign: int = 1):
+        self._add(seller_id, sign, sign * quantity, sign * price * quantity, sign * (quantity > 0))
+
+    # A product's stock moved from old to new
+    def stock(self, seller_id: int, price: float, old: int, new: int):
+        self._add(seller_id, 0, new - old, price * (new - old), int(new > 0) - int(old > 0))
+
+    async def apply(self, db: AsyncSession):
+        changed = {seller_id: totals for seller_id, totals in self.by_seller.items() if any(totals)}
+        if not changed:
+            return
+        insert = dialect_insert(db)
+        # Seller rows in id order so concurrent writers lock them in the same order
+        for seller_id in sorted(changed):
+            values = dict(zip(STAT_FIELDS, changed[seller_id]))
+            statement = insert(SellerStats).values(user_id=seller_id, **values)
+            await db.execute(statement.on_conflict_do_update(
+                index_elements=[SellerStats.user_id],
+                set_={field: getattr(SellerStats, field) + statement.excluded[field] for field in STAT_FIELDS},
+            ))
+
+        totals = [sum(column) for column in zip(*changed.values())]
+        statement = insert(CatalogStats).values(shard=random.randrange(CATALOG_STATS_SHARDS), **dict(zip(STAT_FIELDS, totals)))
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[CatalogStats.shard],
+            set_={field: getattr(CatalogStats, field) + statement.excluded[field] for field in STAT_FIELDS},
+        ))
+        self.by_seller.clear()
+
+
+# Add cart demand deltas {product_id: (units, carts)} in one statement.
+# The seller id comes from products, so callers do not need to look it up.
+async def record_demand(db: AsyncSession, deltas: dict):
+    deltas = {product_id: delta for product_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    units = case({product_id: units for product_id, (units, _) in deltas.items()}, value=Product.id)
+    carts = case({product_id: carts for product_id, (_, carts) in deltas.items()}, value=Product.id)
+    source = select(Product.id, Product.user_id, units, carts).where(Product.id.in_(deltas)).order_by(Product.id)
+
+    insert = dialect_insert(db)
+    statement = insert(ProductDemand).from_select(["product_id", "seller_id", "cart_units", "cart_count"], source)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[ProductDemand.product_id],
+        set_={
+            "cart_units": ProductDemand.cart_units + statement.excluded.cart_units,
+            "cart_count": ProductDemand.cart_count + statement.excluded.cart_count,
+        },
+    ))
+
+
+# Demand change of one cart line going from old to new units
+def line_demand(old: int, new: int):
+    return new - old, int(new > 0) - int(old > 0)
+
+
+def stats_payload(row) -> dict:
+    if row is None:
+        return {"product_count": 0, "stock_units": 0, "stock_value": 0.0, "in_stock_count": 0}
+    return {
+        "product_count": row.product_count or 0,
+        "stock_units": row.stock_units or 0,
+        "stock_value": round(row.stock_value or 0.0, 2),
+        "in_stock_count": row.in_stock_count or 0,
+    }
+
+
+async def load_seller_stats(db: AsyncSession, user_id: int) -> dict:
+    row = await db.get(SellerStats, user_id)
+    demand = (await db.execute(
+        select(ProductDemand.product_id, ProductDemand.cart_units, ProductDemand.cart_count)
+        .where(ProductDemand.seller_id == user_id, ProductDemand.cart_units > 0)
+        .order_by(ProductDemand.cart_units.desc(), ProductDemand.product_id)
+        .limit(TOP_DEMAND_LIMIT)
+    )).all()
+    return {
+        "user_id": user_id,
+        **stats_payload(row),
+        "top_demand": [
+            {"product_id": product_id, "cart_units": cart_units, "cart_count": cart_count}
+            for product_id, cart_units, cart_count in demand
+        ],
+    }
+
+
+async def load_catalog_stats(db: AsyncSession) -> dict:
+    if not backfilled:
+        row = (await db.execute(select(*[column.label(field) for field, column in zip(STAT_FIELDS, product_aggregates())]))).one()
+        return stats_payload(row)
+    row = (await db.execute(
+        select(*[func.sum(getattr(CatalogStats, field)).label(field) for field in STAT_FIELDS])
+    )).one()
+    return stats_payload(row)
+
+
+async def catalog_product_count(db: AsyncSession) -> int:
+    if not backfilled:
+        return await db.scalar(select(func.count(Product.id)))
+    return await db.scalar(select(func.coalesce(func.sum(CatalogStats.product_count), 0)))
+
+
+# Reconciliation.
+# Each pass locks the summary rows it is about to check before aggregating the
+# source rows, so a concurrent write has either committed (and is counted) or
+# is waiting for the lock (and adds its delta after the repair). Anything that
+# slips through, e.g. a summary row created mid-pass, is fixed on the next run.
+# Sellers and products are processed in id batches to keep locks short.
+def product_aggregates() -> list:
+    return [
+        func.count(Product.id),
+        func.coalesce(func.sum(Product.quantity), 0),
+        func.coalesce(func.sum(Product.price * Product.quantity), 0.0),
+        func.coalesce(func.sum(case((Product.quantity > 0, 1), else_=0)), 0),
+    ]
+
+
+def source_aggregates(user_ids):
+    return (
+        select(Product.user_id, *product_aggregates())
+        .where(Product.user_id.in_(user_ids))
+        .group_by(Product.user_id)
+    )
+
+
+def differs(stored, actual) -> bool:
+    # Relative tolerance so float sums of large stock values do not count as drift
+    return any(abs((a or 0) - (b or 0)) > 1e-6 * max(1, abs(b or 0)) for a, b in zip(stored, actual))
+
+
+async def reconcile_sellers(db: AsyncSession, user_ids) -> int:
+    stored = {
+        row[0]: tuple(row[1:])
+        for row in (await db.execute(
+            select(SellerStats.user_id, *[getattr(SellerStats, field) for field in STAT_FIELDS])
+            .where(SellerStats.user_id.in_(user_ids))
+            .order_by(SellerStats.user_id)
+            .with_for_update()
+        )).all()
+    }
+    actual = {row[0]: tuple(row[1:]) for row in (await db.execute(source_aggregates(user_ids))).all()}
+
+    repaired = 0
+    insert = dialect_insert(db)
+    for user_id in user_ids:
+        expected = actual.get(user_id, (0, 0, 0.0, 0))
+        current = stored.get(user_id)
+        if current is None and not any(expected):
+            continue
+        if current is not None and not differs(current, expected):
+            continue
+        values = dict(zip(STAT_FIELDS, expected))
+        statement = insert(SellerStats).values(user_id=user_id, **values)
+        await db.execute(statement.on_conflict_do_update(index_elements=[SellerStats.user_id], set_=values))
+        repaired += 1
+    return repaired
+
+
+async def reconcile_demand(db: AsyncSession, product_ids) -> int:
+    stored = {
+        row[0]: tuple(row[1:])
+        for row in (await db.execute(
+            select(ProductDemand.product_id, ProductDemand.cart_units, ProductDemand.cart_count)
+            .where(ProductDemand.product_id.in_(product_ids))
+            .order_by(ProductDemand.product_id)
+            .with_for_update()
+        )).all()
+    }
+    actual = {
+        row[0]: tuple(row[1:])
+        for row in (await db.execute(
+            select(Cart.product_id, func.sum(Cart.quantity), func.count())
+            .where(Cart.product_id.in_(product_ids), Cart.quantity > 0)
+            .group_by(Cart.product_id)
+        )).all()
+    }
+    sellers = dict((await db.execute(select(Product.id, Product.user_id).where(Product.id.in_(product_ids)))).all())
+
+    repaired = 0
+    insert = dialect_insert(db)
+    for product_id in product_ids:
+        expected = actual.get(product_id, (0, 0))
+        current = stored.get(product_id)
+        if current is None and not any(expected):
+            continue
+        if product_id not in sellers or (current is not None and not differs(current, expected)):
+            continue
+        values = {"cart_units": expected[0], "cart_count": expected[1]}
+        statement = insert(ProductDemand).values(product_id=product_id, seller_id=sellers[product_id], **values)
+        await db.execute(statement.on_conflict_do_update(index_elements=[ProductDemand.product_id], set_=values))
+        repaired += 1
+    return repaired
+
+
+# Catalog shards are rebuilt from the (already reconciled) seller rows
+async def reconcile_catalog(db: AsyncSession) -> int:
+    shards = (await db.execute(
+        select(CatalogStats.shard, *[getattr(CatalogStats, field) for field in STAT_FIELDS])
+        .order_by(CatalogStats.shard)
+        .with_for_update()
+    )).all()
+    expected = tuple((await db.execute(
+        select(*[func.coalesce(func.sum(getattr(SellerStats, field)), 0) for field in STAT_FIELDS])
+    )).one())
+    current = tuple(sum(row[index + 1] or 0 for row in shards) for index in range(len(STAT_FIELDS)))
+    if shards and not differs(current, expected):
+        return 0
+
+    # Collapse into shard 0 and zero the rest
+    await db.execute(update(CatalogStats).where(CatalogStats.shard != 0).values(**{field: 0 for field in STAT_FIELDS}))
+    values = dict(zip(STAT_FIELDS, expected))
+    statement = dialect_insert(db)(CatalogStats).values(shard=0, **values)
+    await db.execute(statement.on_conflict_do_update(index_elements=[CatalogStats.shard], set_=values))
+    return 1
+
+
+async def id_batches(session_factory, column):
+    last = 0
+    while True:
+        async with session_factory() as db:
+            ids = (await db.scalars(select(column).where(column > last).order_by(column).limit(RECONCILE_BATCH_SIZE))).all()
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+async def reconcile_stats(session_factory) -> int:
+    global backfilled
+    repaired = 0
+    async for user_ids in id_batches(session_factory, User.id):
+        async with session_factory() as db:
+            repaired += await reconcile_sellers(db, user_ids)
+            await db.commit()
+    async for product_ids in id_batches(session_factory, Product.id):
+        async with session_factory() as db:
+            repaired += await reconcile_demand(db, product_ids)
+            await db.commit()
+    async with session_factory() as db:
+        repaired += await reconcile_catalog(db)
+        await db.commit()
+    backfilled = True
+    return repaired
+
+
+# on_repaired() runs after a pass that changed any rows, so callers can drop
+# counts and cached pages built from the old totals
+async def reconcile_stats_forever(session_factory, on_repaired=None, interval: float = RECONCILE_INTERVAL_SECONDS):
+    while True:
+        try:
+            repaired = await reconcile_stats(session_factory)
+            if repaired:
+                logger.warning("Repaired %d drifted stats rows", repaired)
+                if on_repaired is not None:
+                    await on_repaired()
+        except Exception:
+            logger.exception("Failed to reconcile catalog stats")
+        await asyncio.sleep(interval)
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from backend.models import ImageBlob
+
+
+# Content-addressed image storage.
+# Every upload is streamed to a temp file while it is hashed, then stored once
+# under static/uploads/<aa>/<bb>/<sha256>.<ext>. Products point at the blob by
+# hash and image_blobs.ref_count tracks how many products use each file.
+UPLOAD_FOLDER = "static/uploads"
+TEMP_FOLDER = os.path.join(UPLOAD_FOLDER, ".tmp")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+# Magic numbers of the image formats we accept, mapped to MIME type and extension
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (b"GIF87a", "image/gif", "gif"),
+    (b"GIF89a", "image/gif", "gif"),
+]
+
+
+@dataclass
+class StagedBlob:
+    sha256: str
+    size: int
+    mime_type: str
+    extension: str
+    temp_path: str
+
+    @property
+    def relative_path(self) -> str:
+        # Two levels of sharding keep every directory small
+        return f"{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}.{self.extension}"
+
+
+def sniff_image_type(head: bytes):
+    for signature, mime_type, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type, extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    return None
+
+
+def blob_path(relative_path: str) -> str:
+    return os.path.join(UPLOAD_FOLDER, *relative_path.split("/"))
+
+
+def _write_chunk(buffer, hasher, chunk: bytes):
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Stream the upload to a temp file, hashing as we go.
+# Hashing and writing run in the threadpool so the event loop never blocks.
+# The image size is checked per chunk; the request body as a whole is capped
+# while it is received by the LimitRequestSize middleware in main.
+async def stage_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StagedBlob:
+    await run_in_threadpool(os.makedirs, TEMP_FOLDER, exist_ok=True)
+    temp_path = os.path.join(TEMP_FOLDER, uuid.uuid4().hex)
+    hasher = hashlib.sha256()
+    size = 0
+    image_type = None
+
+    buffer = await run_in_threadpool(open, temp_path, "wb")
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            if image_type is None:
+                image_type = sniff_image_type(chunk[:16])
+                if image_type is None:
+                    raise HTTPException(status_code=415, detail="Unsupported image type")
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail="Image is too large")
+            await run_in_threadpool(_write_chunk, buffer, hasher, chunk)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(_remove, temp_path)
+        raise
+    await run_in_threadpool(buffer.close)
+
+    if image_type is None:
+        await run_in_threadpool(_remove, temp_path)
+        raise HTTPException(status_code=400, detail="Image is empty")
+
+    mime_type, extension = image_type
+    return StagedBlob(sha256=hasher.hexdigest(), size=size, mime_type=mime_type, extension=extension, temp_path=temp_path)
+
+
+# Take a reference on the blob inside the caller's transaction.
+# The first product using a hash inserts the row; later ones only bump ref_count.
+# Call it before adding the product, whose image_sha256 references this row.
+async def acquire_blob(db, staged: StagedBlob):
+    increment = (
+        update(ImageBlob)
+        .where(ImageBlob.sha256 == staged.sha256)
+        .values(ref_count=ImageBlob.ref_count + 1)
+    )
+    if (await db.execute(increment)).rowcount:
+        return
+
+    # Flush anything pending first, so the savepoint below only covers the
+    # blob insert and only its duplicate-key error is treated as a race
+    await db.flush()
+    try:
+        async with db.begin_nested():
+            await db.execute(insert(ImageBlob).values(
+                sha256=staged.sha256,
+                size=staged.size,
+                mime_type=staged.mime_type,
+                path=staged.relative_path,
+                ref_count=1,
+            ))
+    except IntegrityError:
+        # Another request inserted the same hash first
+        await db.execute(increment)
+
+
+# Called after the product row is committed. The file is written only if no
+# copy exists yet; otherwise the staged duplicate is dropped.
+async def publish_blob(staged: StagedBlob):
+    final_path = blob_path(staged.relative_path)
+
+    def publish():
+        if os.path.exists(final_path):
+            _remove(staged.temp_path)
+            return
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(staged.temp_path, final_path)
+
+    await run_in_threadpool(publish)
+
+
+async def discard_staged(staged: StagedBlob):
+    await run_in_threadpool(_remove, staged.temp_path)
+
+
+# Drop one reference inside the caller's transaction
+async def release_blob(db, sha256: str):
+    await db.execute(
+        update(ImageBlob)
+        .where(ImageBlob.sha256 == sha256)
+        .values(ref_count=ImageBlob.ref_count - 1)
+    )
+
+
+# Background task: delete the blob row and its file once nothing references it.
+# The row stays locked while the file is removed, so a concurrent upload of the
+# same content waits and then re-creates both the row and the file.
+async def collect_orphan_blob(session_factory, sha256: str):
+    async with session_factory() as db:
+        blob = await db.scalar(
+            select(ImageBlob)
+            .where(ImageBlob.sha256 == sha256, ImageBlob.ref_count <= 0)
+            .with_for_update()
+        )
+        if blob is None:
+            return
+        await run_in_threadpool(_remove, blob_path(blob.path))
+        await db.delete(blob)
+        await db.commit()
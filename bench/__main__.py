@@ -0,0 +1,4 @@
+from bench.run import main
+
+
+main()
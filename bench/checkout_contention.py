@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import func, select
+
+from backend.auth import create_access_token
+from backend.models import Cart, OrderItem, Product, User
+from backend.stats import reconcile_stats
+from bench.harness import make_client, prepare_app, release_app
+
+
+# Contention benchmark for POST /checkout.
+# Hundreds of buyers with the same hot product in their cart check out at
+# once through the real endpoint. The run reports throughput and latency and
+# fails if more units were sold than were in stock.
+#
+#   python -m bench.checkout_contention --buyers 300 --stock 100
+#   python -m bench.checkout_contention --database-url postgresql+asyncpg://user:pw@localhost/bench_db
+#
+# SQLite serializes writers, so the default run uses a single connection;
+# point it at a scratch Postgres database to measure real row-lock contention.
+
+
+async def seed(session_factory, buyers: int, stock: int, per_buyer: int):
+    run_id = uuid.uuid4().hex[:8]
+    async with session_factory() as db:
+        seller = User(first_name="Seller", last_name=run_id, email=f"seller-{run_id}@bench", password="-", full_address="Bench")
+        db.add(seller)
+        await db.flush()
+        product = Product(name=f"Hot product {run_id}", description="Contended item", price=10.0, quantity=stock, image=None, user_id=seller.id)
+        buyer_rows = [
+            User(first_name="Buyer", last_name=str(i), email=f"buyer-{run_id}-{i}@bench", password="-", full_address="Bench")
+            for i in range(buyers)
+        ]
+        db.add(product)
+        db.add_all(buyer_rows)
+        await db.flush()
+        db.add_all([Cart(user_id=buyer.id, product_id=product.id, quantity=per_buyer) for buyer in buyer_rows])
+        await db.commit()
+        return product.id, [buyer.id for buyer in buyer_rows]
+
+
+async def run(database_url: str, workdir: str, buyers: int, stock: int, per_buyer: int) -> bool:
+    _, session_factory = await prepare_app(database_url, workdir)
+    product_id, buyer_ids = await seed(session_factory, buyers, stock, per_buyer)
+    # Seeded rows bypass the app; backfill the catalog summary tables
+    await reconcile_stats(session_factory)
+    tokens = [create_access_token(data={"sub": buyer_id}) for buyer_id in buyer_ids]
+
+    latencies = []
+    statuses = {}
+    start_gate = asyncio.Event()
+
+    async def buy(client, token):
+        await start_gate.wait()
+        started = time.perf_counter()
+        response = await client.post("/checkout", headers={"Authorization": f"Bearer {token}"})
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async with make_client(timeout=120) as client:
+        tasks = [asyncio.create_task(buy(client, token)) for token in tokens]
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        start_gate.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    async with session_factory() as db:
+        remaining = await db.scalar(select(Product.quantity).where(Product.id == product_id))
+        sold = await db.scalar(select(func.coalesce(func.sum(OrderItem.quantity), 0)).where(OrderItem.product_id == product_id))
+    await release_app()
+
+    latencies.sort()
+    expected_sales = min(buyers, stock // per_buyer) * per_buyer
+    consistent = remaining >= 0 and sold + remaining == stock and sold <= stock
+    print(f"buyers={buyers} stock={stock} per_buyer={per_buyer} database={database_url}")
+    print(f"elapsed={elapsed:.3f}s throughput={buyers / elapsed:.1f} checkouts/s")
+    print(f"latency p50={statistics.median(latencies) * 1000:.1f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms "
+          f"max={latencies[-1] * 1000:.1f}ms")
+    print(f"responses={dict(sorted(statuses.items()))}")
+    print(f"sold={sold} remaining={remaining} expected_sold={expected_sales} oversold={sold > stock}")
+    print("OK: no oversell" if consistent else "FAIL: stock accounting is inconsistent")
+    return consistent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent checkout benchmark for a single hot product")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--buyers", type=int, default=300)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--per-buyer", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="checkout-bench-")
+    database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    ok = asyncio.run(run(database_url, workdir, args.buyers, args.stock, args.per_buyer))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import io
+import itertools
+import os
+import random
+from dataclasses import dataclass, field
+
+from sqlalchemy import insert, select
+
+from backend.models import Cart, Product, User
+from backend.passwords import get_password_hash
+from backend.stats import reconcile_stats
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow, images are tiny byte blobs with a JPEG signature
+    Image = None
+
+
+# Deterministic synthetic data: the same seed and scale always produce the
+# same users, products, carts and image files.
+BENCH_PASSWORD = "bench-password"
+BENCH_EMAIL = "bench-user-{}@bench.local"
+INSERT_BATCH_SIZE = 5000
+
+WORDS = [
+    "bike", "helmet", "lamp", "chair", "table", "phone", "case", "guitar", "camera", "lens",
+    "jacket", "boots", "watch", "kettle", "blender", "drill", "tent", "backpack", "sofa", "desk",
+    "red", "blue", "vintage", "compact", "wireless", "wooden", "steel", "leather", "mini", "pro",
+]
+
+
+@dataclass
+class Scale:
+    users: int
+    products_per_user: int
+    cart_lines_per_user: int
+    images: int
+
+
+SCALES = {
+    "tiny": Scale(users=20, products_per_user=10, cart_lines_per_user=2, images=5),
+    "small": Scale(users=200, products_per_user=50, cart_lines_per_user=3, images=20),
+    "medium": Scale(users=2000, products_per_user=100, cart_lines_per_user=5, images=50),
+    "large": Scale(users=10000, products_per_user=200, cart_lines_per_user=5, images=100),
+}
+
+
+@dataclass
+class Dataset:
+    user_ids: list = field(default_factory=list)
+    emails: list = field(default_factory=list)
+    product_ids: list = field(default_factory=list)
+    image_paths: list = field(default_factory=list)
+
+
+def product_name(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(3)).capitalize()
+
+
+def generate_image(rng: random.Random, size: int = 256) -> bytes:
+    if Image is None:
+        return b"\xff\xd8\xff" + rng.randbytes(4096)
+    color = tuple(rng.randrange(256) for _ in range(3))
+    image = Image.new("RGB", (size, size), color)
+    for _ in range(20):
+        x, y = rng.randrange(size), rng.randrange(size)
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, min(size, x + 24), min(size, y + 24)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def write_images(workdir: str, scale: Scale, seed: int) -> list:
+    rng = random.Random(f"{seed}:images")
+    folder = os.path.join(workdir, "images")
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for index in range(scale.images):
+        path = os.path.join(folder, f"bench-{index}.jpg")
+        with open(path, "wb") as image_file:
+            image_file.write(generate_image(rng))
+        paths.append(path)
+    return paths
+
+
+async def insert_batched(db, model, rows):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, INSERT_BATCH_SIZE)):
+        await db.execute(insert(model), batch)
+
+
+# Seed users, products and carts. Re-running against a database that already
+# holds the bench users reuses them instead of inserting duplicates.
+async def seed_database(session_factory, scale: Scale, seed: int) -> Dataset:
+    rng = random.Random(f"{seed}:rows")
+    emails = [BENCH_EMAIL.format(index) for index in range(scale.users)]
+
+    async with session_factory() as db:
+        existing = await db.scalar(select(User.id).where(User.email == emails[0]))
+        if existing is None:
+            password_hash = get_password_hash(BENCH_PASSWORD)
+            await insert_batched(db, User, (
+                {
+                    "first_name": f"Bench{index}",
+                    "last_name": "User",
+                    "email": email,
+                    "password": password_hash,
+                    "full_address": f"{rng.randrange(1, 200)} Bench Street, Test City",
+                }
+                for index, email in enumerate(emails)
+            ))
+            user_ids = (await db.scalars(select(User.id).where(User.email.in_(emails)).order_by(User.id))).all()
+
+            await insert_batched(db, Product, (
+                {
+                    "name": product_name(rng),
+                    "description": " ".join(rng.choice(WORDS) for _ in range(12)),
+                    "price": round(rng.uniform(1, 1000), 2),
+                    "quantity": rng.randrange(0, 50),
+                    "image": None,
+                    "user_id": user_id,
+                }
+                for user_id in user_ids
+                for _ in range(scale.products_per_user)
+            ))
+            product_ids = (await db.scalars(
+                select(Product.id).where(Product.user_id.in_(user_ids)).order_by(Product.id)
+            )).all()
+
+            await insert_batched(db, Cart, (
+                {"user_id": user_id, "product_id": product_id, "quantity": rng.randrange(1, 4)}
+                for user_id in user_ids
+                for product_id in rng.sample(product_ids, min(scale.cart_lines_per_user, len(product_ids)))
+            ))
+            await db.commit()
+        else:
+            user_ids = (await db.scalars(select(User.id).where(User.email.in_(emails)).order_by(User.id))).all()
+            product_ids = (await db.scalars(
+                select(Product.id).where(Product.user_id.in_(user_ids)).order_by(Product.id)
+            )).all()
+
+    # The rows above bypass the app, so backfill the catalog summary tables
+    await reconcile_stats(session_factory)
+    return Dataset(user_ids=list(user_ids), emails=emails, product_ids=list(product_ids))
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import random
+import time
+
+from backend.auth import create_access_token
+from bench.datagen import BENCH_PASSWORD
+
+
+# Async load driver. Each worker loops over scenarios drawn from a weighted mix
+# with its own seeded RNG and times every HTTP call under a "scenario:route"
+# label.
+DEFAULT_MIX = {"browse": 5, "dashboard": 2, "login": 1, "upload": 1, "cart": 2}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}  # label -> list of seconds
+        self.errors = {}  # label -> count
+
+    async def call(self, label: str, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            return None
+        self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return response
+
+
+class Context:
+    def __init__(self, client, dataset, recorder):
+        self.client = client
+        self.dataset = dataset
+        self.recorder = recorder
+        self.tokens = {user_id: create_access_token(data={"sub": user_id}) for user_id in dataset.user_ids}
+        self.images = []
+        for path in dataset.image_paths:
+            with open(path, "rb") as image_file:
+                self.images.append((os.path.basename(path), image_file.read()))
+
+    def auth(self, user_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+
+async def browse(ctx: Context, rng: random.Random):
+    response = await ctx.recorder.call("browse:/products", ctx.client.get("/products", params={"limit": 20, "with_total": "true"}))
+    await ctx.recorder.call("browse:/total_pages", ctx.client.get("/total_pages", params={"limit": 20}))
+    for _ in range(rng.randrange(0, 4)):
+        if response is None or response.status_code != 200 or not response.json().get("next_cursor"):
+            break
+        cursor = response.json()["next_cursor"]
+        response = await ctx.recorder.call(
+            "browse:/products?after", ctx.client.get("/products", params={"limit": 20, "after": cursor})
+        )
+
+
+async def dashboard(ctx: Context, rng: random.Random):
+    user_id = rng.choice(ctx.dataset.user_ids)
+    await ctx.recorder.call("dashboard:/user_products", ctx.client.get(f"/user_products/{user_id}"))
+
+
+async def login(ctx: Context, rng: random.Random):
+    email = rng.choice(ctx.dataset.emails)
+    await ctx.recorder.call("login:/login", ctx.client.post("/login", json={"email": email, "password": BENCH_PASSWORD}))
+
+
+async def upload(ctx: Context, rng: random.Random):
+    if not ctx.images:
+        return
+    user_id = rng.choice(ctx.dataset.user_ids)
+    filename, content = rng.choice(ctx.images)
+    await ctx.recorder.call("upload:/products", ctx.client.post(
+        "/products",
+        headers=ctx.auth(user_id),
+        data={"name": f"Uploaded {rng.randrange(10**6)}", "description": "Bench upload", "price": "9.99", "quantity": "3"},
+        files={"image": (filename, content, "image/jpeg")},
+    ))
+
+
+async def cart(ctx: Context, rng: random.Random):
+    user_id = rng.choice(ctx.dataset.user_ids)
+    product_id = rng.choice(ctx.dataset.product_ids)
+    headers = ctx.auth(user_id)
+    await ctx.recorder.call("cart:POST /cart", ctx.client.post("/cart", headers=headers, json={"product_id": product_id, "quantity": 1}))
+    await ctx.recorder.call("cart:GET /cart", ctx.client.get("/cart", headers=headers))
+    await ctx.recorder.call("cart:DELETE /cart", ctx.client.delete(f"/cart/{product_id}", headers=headers))
+
+
+SCENARIOS = {"browse": browse, "dashboard": dashboard, "login": login, "upload": upload, "cart": cart}
+
+
+def parse_mix(text: str) -> dict:
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', expected one of {sorted(SCENARIOS)}")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+# Run the mix with `concurrency` workers until `duration` seconds pass or
+# `iterations` scenarios have run, whichever comes first. Returns wall time.
+async def run_load(ctx: Context, mix: dict, concurrency: int, duration: float, iterations: int, seed: int) -> float:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    remaining = [iterations]
+    deadline = time.perf_counter() + duration
+
+    async def worker(index: int):
+        rng = random.Random(f"{seed}:worker:{index}")
+        while time.perf_counter() < deadline and remaining[0] > 0:
+            remaining[0] -= 1
+            await SCENARIOS[rng.choices(names, weights)[0]](ctx, rng)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(index) for index in range(concurrency)])
+    return time.perf_counter() - started
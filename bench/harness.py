@@ -0,0 +1,48 @@
+import os
+
+import httpx
+
+from backend import database, main, storage
+from backend.database import PoolSettings
+from backend.passwords import password_pool
+from backend.table_maker import create_tables
+
+
+# Wiring shared by the benchmarks: point the app at a benchmark database (and
+# optional stand-in replicas) and upload folder, and build an HTTP client that
+# talks to it either in-process (default, fully offline) or over the network
+# to a running server.
+
+
+def bench_settings(database_url: str) -> PoolSettings:
+    if database_url.startswith("sqlite"):
+        # SQLite serializes writers; one connection avoids spurious "database is locked"
+        return PoolSettings(pool_size=1, max_overflow=0)
+    return PoolSettings(pool_size=20, max_overflow=0)
+
+
+def make_engine(database_url: str):
+    return database.make_engine(database_url, bench_settings(database_url))
+
+
+async def prepare_app(database_url: str, workdir: str, replica_urls=()):
+    os.makedirs(workdir, exist_ok=True)
+    database.router.configure(database_url, replica_urls, bench_settings(database_url))
+    for engine in database.router.engines:
+        await create_tables(engine)
+
+    storage.UPLOAD_FOLDER = os.path.join(workdir, "uploads")
+    storage.TEMP_FOLDER = os.path.join(storage.UPLOAD_FOLDER, ".tmp")
+    return database.router.primary_engine, database.SessionLocal
+
+
+async def release_app():
+    password_pool.shutdown()
+    main.variant_cache.shutdown()
+    await database.router.dispose()
+
+
+def make_client(base_url: str = None, timeout: float = 60) -> httpx.AsyncClient:
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=timeout)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=timeout)
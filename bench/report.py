@@ -0,0 +1,87 @@
+import json
+import math
+import platform
+from datetime import datetime
+
+
+# Latency/throughput summaries and baseline comparison
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(recorder, elapsed: float) -> dict:
+    summary = {}
+    for label in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies.get(label, []))
+        summary[label] = {
+            "count": len(values),
+            "errors": recorder.errors.get(label, 0),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+            "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        }
+    return summary
+
+
+def print_report(summary: dict, elapsed: float):
+    header = f"{'operation':<28}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for label, stats in summary.items():
+        print(
+            f"{label:<28}{stats['count']:>8}{stats['errors']:>8}{stats['p50_ms']:>10.2f}"
+            f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['throughput_rps']:>10.2f}"
+        )
+    total = sum(stats["count"] for stats in summary.values())
+    print(f"\n{total} requests in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.1f} req/s)")
+
+
+def save_report(path: str, summary: dict, settings: dict):
+    document = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "settings": settings,
+        "results": summary,
+    }
+    with open(path, "w") as report_file:
+        json.dump(document, report_file, indent=2, sort_keys=True)
+
+
+def load_report(path: str) -> dict:
+    with open(path) as report_file:
+        return json.load(report_file)
+
+
+# A regression is a p95 more than `tolerance` above baseline, a throughput more
+# than `tolerance` below it, or a new error where there was none.
+def compare(summary: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for label, stats in summary.items():
+        before = baseline["results"].get(label)
+        if before is None:
+            continue
+        if before["p95_ms"] and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95_ms']:.2f}ms -> {stats['p95_ms']:.2f}ms")
+        if before["throughput_rps"] and stats["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {before['throughput_rps']:.2f} -> {stats['throughput_rps']:.2f} req/s")
+        if stats["errors"] and not before["errors"]:
+            regressions.append(f"{label}: {stats['errors']} errors (baseline had none)")
+    return regressions
+
+
+def print_comparison(summary: dict, baseline: dict):
+    print(f"\n{'operation':<28}{'p95 base':>10}{'p95 now':>10}{'delta':>9}")
+    for label, stats in summary.items():
+        before = baseline["results"].get(label)
+        if before is None:
+            continue
+        delta = (stats["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        print(f"{label:<28}{before['p95_ms']:>10.2f}{stats['p95_ms']:>10.2f}{delta:>+8.1f}%")
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from backend import database
+from bench.datagen import SCALES, seed_database, write_images
+from bench.driver import Context, Recorder, parse_mix, run_load
+from bench.harness import make_engine, prepare_app, release_app, make_client
+from bench.report import compare, load_report, print_comparison, print_report, save_report, summarize
+
+
+# Load test entry point:
+#
+#   python -m bench --scale small --duration 30 --concurrency 32
+#   python -m bench --mix browse=5,cart=2 --save-baseline bench/baseline.json
+#   python -m bench --compare bench/baseline.json --tolerance 0.15
+#
+# By default the app runs in-process against a fresh SQLite database in a temp
+# directory, so no network or server is needed. Use --database-url for a local
+# Postgres, --replica-url to route catalog reads to a second database standing
+# in for a replica, and --base-url to drive an already running server that
+# uses the same database.
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Load test the marketplace backend")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite database")
+    parser.add_argument("--replica-url", action="append", default=[],
+                        help="read replica for the in-process app; seeded like the primary (repeatable)")
+    parser.add_argument("--base-url", default=None, help="drive a running server instead of the in-process app")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mix", default=None, help="weighted scenarios, e.g. browse=5,dashboard=2,login=1,upload=1,cart=2")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds to run")
+    parser.add_argument("--iterations", type=int, default=10**9, help="stop after this many scenarios")
+    parser.add_argument("--workdir", default=None, help="where generated images and uploads go")
+    parser.add_argument("--output", default=None, help="write the results as JSON")
+    parser.add_argument("--save-baseline", default=None, help="write the results as a baseline file")
+    parser.add_argument("--compare", default=None, help="baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+
+async def run(args) -> int:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="marketplace-bench-")
+    database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}"
+    scale = SCALES[args.scale]
+    mix = parse_mix(args.mix)
+
+    if args.base_url:
+        engine = make_engine(database_url)
+        session_factory = database.make_session_factory(engine)
+    else:
+        engine, session_factory = await prepare_app(database_url, workdir, args.replica_url)
+
+    print(f"Seeding scale={args.scale} seed={args.seed} into {database_url}")
+    dataset = await seed_database(session_factory, scale, args.seed)
+    if not args.base_url:
+        # Stand-in replicas get the same deterministic data as the primary
+        for replica in database.router.replicas:
+            print(f"Seeding replica {replica.url}")
+            await seed_database(replica.sessions, scale, args.seed)
+    dataset.image_paths = write_images(workdir, scale, args.seed)
+
+    recorder = Recorder()
+    async with make_client(args.base_url) as client:
+        ctx = Context(client, dataset, recorder)
+        print(f"Running mix={mix} concurrency={args.concurrency} duration={args.duration}s")
+        elapsed = await run_load(ctx, mix, args.concurrency, args.duration, args.iterations, args.seed)
+
+    if args.base_url:
+        await engine.dispose()
+    else:
+        await release_app()
+
+    summary = summarize(recorder, elapsed)
+    print()
+    print_report(summary, elapsed)
+
+    settings = {
+        "scale": args.scale,
+        "seed": args.seed,
+        "mix": mix,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "database": database_url.split(":", 1)[0],
+        "replicas": len(args.replica_url),
+        "target": args.base_url or "in-process",
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            save_report(path, summary, settings)
+            print(f"Saved results to {path}")
+
+    if args.compare:
+        baseline = load_report(args.compare)
+        print_comparison(summary, baseline)
+        regressions = compare(summary, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions beyond tolerance")
+    return 0
+
+
+def main(argv=None):
+    sys.exit(asyncio.run(run(parse_args(argv))))
+
+
+if __name__ == "__main__":
+    main()
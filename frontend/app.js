@@ -1,25 +1,48 @@
 let currentPage = 0;
 const limit = 10; // Limit set to 10 for standard display
 let totalPages = 0; // Total number of pages
+// Cursor for each visited page: pageCursors[n] is the "after" cursor that loads page n
+let pageCursors = [null];
 
-// Function to fetch total pages from the backend
-async function fetchTotalPages() {
-    try {
-        const response = await fetch(`http://127.0.0.1:8000/total_pages?limit=${limit}`);
-        const data = await response.json();
-        totalPages = data.total_pages;  // Update the total pages
-    } catch (error) {
-        console.error('Error fetching total pages:', error);
-    }
+// Build the table row for one product
+function createProductRow(product) {
+    const row = document.createElement('tr');
+    row.dataset.productId = product.id;
+
+    row.innerHTML = `
+    <td>${product.id}</td>
+    <td><img src="/images/${product.image}?w=128&format=webp" loading="lazy" alt="${product.name}" style="max-width: 100px;"></td>
+    <td>${product.name}</td>
+    <td>${product.description}</td>
+    <td>$${product.price}</td>
+    <td class="quantity">${product.quantity}</td>
+    <td>${product.full_address || 'N/A'}</td> <!-- Safeguard in case full_address is undefined -->
+    `;
+    return row;
 }
 
-// Function to fetch products with pagination
+// Function to fetch products with cursor pagination
+// The first request also asks for the total so /total_pages is not needed
 async function fetchProducts(page = 0) {
-    const skip = page * limit;
+    const after = pageCursors[page];
+    let url = `http://127.0.0.1:8000/products?limit=${limit}`;
+    if (after) {
+        url += `&after=${encodeURIComponent(after)}`;
+    }
+    if (page === 0) {
+        url += '&with_total=true';
+    }
+
     try {
         // Fetch products from the backend
-        const response = await fetch(`http://127.0.0.1:8000/products?skip=${skip}&limit=${limit}`);
-        const data = await response.json();
+        const response = await fetch(url);
+        const pageData = await response.json();
+        const data = pageData.items;
+
+        if (pageData.total_pages !== null && pageData.total_pages !== undefined) {
+            totalPages = pageData.total_pages;  // Update the total pages
+        }
+        pageCursors[page + 1] = pageData.next_cursor;
 
         // Get the table body element where rows will be inserted
         const tableBody = document.querySelector('#product-table tbody');
@@ -29,19 +52,7 @@ async function fetchProducts(page = 0) {
 
         // Loop through the products and create a row for each
         data.forEach(product => {
-            const row = document.createElement('tr');
-            
-            row.innerHTML = `
-            <td>${product.id}</td>
-            <td><img src="/static/uploads/${product.image}" alt="${product.name}" style="max-width: 100px;"></td>
-            <td>${product.name}</td>
-            <td>${product.description}</td>
-            <td>$${product.price}</td>
-            <td>${product.quantity}</td>
-            <td>${product.full_address || 'N/A'}</td> <!-- Safeguard in case full_address is undefined -->
-            `;
-            
-            tableBody.appendChild(row);  // Append the row to the table
+            tableBody.appendChild(createProductRow(product));  // Append the row to the table
         });
 
         // Update the current page number display
@@ -49,7 +60,7 @@ async function fetchProducts(page = 0) {
 
         // Disable/Enable Previous and Next buttons based on logic
         document.querySelector("#prev-button").disabled = page === 0;  // Disable Previous button on the first page
-        document.querySelector("#next-button").disabled = page >= (totalPages - 1);  // Disable Next button on the last page
+        document.querySelector("#next-button").disabled = !pageData.next_cursor;  // Disable Next button on the last page
 
         // Update the current page
         currentPage = page;
@@ -71,7 +82,7 @@ async function fetchProducts(page = 0) {
 
 // Event listeners for pagination buttons
 document.querySelector("#next-button").addEventListener("click", () => {
-    if (currentPage < totalPages - 1) {
+    if (pageCursors[currentPage + 1]) {
         fetchProducts(currentPage + 1);
     }
 });
@@ -82,8 +93,49 @@ document.querySelector("#prev-button").addEventListener("click", () => {
     }
 });
 
-// Initialize: Fetch total pages and first set of products
+// Live updates: apply catalog changes to the visible page instead of re-polling
+function subscribeToCatalog() {
+    const source = new EventSource('http://127.0.0.1:8000/events?topics=catalog');
+    let connectedBefore = false;
+
+    source.onmessage = (message) => {
+        const event = JSON.parse(message.data);
+        const tableBody = document.querySelector('#product-table tbody');
+
+        if (event.type === 'ready') {
+            // Events may have been missed while reconnecting
+            if (connectedBefore) {
+                fetchProducts(currentPage);
+            }
+            connectedBefore = true;
+        } else if (event.type === 'product.created') {
+            // Newest products come first, so only the first page changes. Its
+            // boundary moves too, so reload it and drop the cursors after it
+            // rather than growing the table past the page size.
+            if (currentPage === 0) {
+                pageCursors = [null];
+                fetchProducts(0);
+            }
+        } else if (event.type === 'product.deleted') {
+            const row = tableBody.querySelector(`tr[data-product-id="${event.product_id}"]`);
+            if (row) {
+                row.remove();
+            }
+        } else if (event.type === 'stock.changed') {
+            event.items.forEach(item => {
+                const cell = tableBody.querySelector(`tr[data-product-id="${item.product_id}"] .quantity`);
+                if (cell) {
+                    cell.innerText = item.quantity;
+                }
+            });
+        } else if (event.type === 'products.imported' || event.type === 'resync') {
+            fetchProducts(currentPage);
+        }
+    };
+}
+
+// Initialize: Fetch the first page of products together with the total
 window.onload = async () => {
-    await fetchTotalPages();  // Fetch the total pages first
-    fetchProducts();          // Fetch the products for the first page
+    fetchProducts();
+    subscribeToCatalog();
 };
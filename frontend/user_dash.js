@@ -14,56 +14,8 @@ document.addEventListener('DOMContentLoaded', async () => {
     }
 
     // Fetch and display user products
-    try {
-        const response = await fetch(`http://127.0.0.1:8000/user_products/${userId}`, {
-            method: 'GET',
-            headers: {
-                'Authorization': `Bearer ${token}`  // Send the token in the request header
-            }
-        });
-
-        const products = await response.json();
-
-        // Check if the response is an array and handle empty products list
-        if (Array.isArray(products)) {
-            const tableBody = document.querySelector('#user-product-table tbody');
-            tableBody.innerHTML = '';  // Clear the table body
-
-            if (products.length === 0) {
-                // No products, display a friendly message
-                const row = document.createElement('tr');
-                row.innerHTML = `<td colspan="7">You haven't added any products yet. Use the form below to add new products.</td>`;
-                tableBody.appendChild(row);
-            } else {
-                // Display products if there are any
-                products.forEach(product => {
-                    const row = document.createElement('tr');
-                    row.innerHTML = `
-                        <td>${product.id}</td>
-                        <td><img src="/static/uploads/${product.image}" alt="${product.name}" style="max-width: 100px;"/></td>
-                        <td>${product.name}</td>
-                        <td>${product.description}</td>
-                        <td>${product.price}</td>
-                        <td>${product.quantity}</td>
-                        <td><button class="delete-product" data-id="${product.id}">Delete</button></td>
-                    `;
-                    tableBody.appendChild(row);
-                });
-
-                // Add event listener to delete buttons
-                document.querySelectorAll('.delete-product').forEach(button => {
-                    button.addEventListener('click', async (e) => {
-                        const productId = e.target.getAttribute('data-id');
-                        await deleteProduct(productId);
-                    });
-                });
-            }
-        } else {
-            console.log('No products found.');
-        }
-    } catch (error) {
-        console.log('Error fetching user products:', error);
-    }
+    await loadUserProducts(userId, token);
+    subscribeToSellerEvents(userId, token);
 
     // Handle product form submission with image upload
     const productForm = document.getElementById('new-product-form');
@@ -125,6 +77,88 @@ document.addEventListener('DOMContentLoaded', async () => {
     });
 });
 
+// Function to fetch and display the seller's products
+async function loadUserProducts(userId, token) {
+    try {
+        const response = await fetch(`http://127.0.0.1:8000/user_products/${userId}`, {
+            method: 'GET',
+            headers: {
+                'Authorization': `Bearer ${token}`  // Send the token in the request header
+            }
+        });
+
+        const products = await response.json();
+
+        // Check if the response is an array and handle empty products list
+        if (Array.isArray(products)) {
+            const tableBody = document.querySelector('#user-product-table tbody');
+            tableBody.innerHTML = '';  // Clear the table body
+
+            if (products.length === 0) {
+                // No products, display a friendly message
+                const row = document.createElement('tr');
+                row.innerHTML = `<td colspan="7">You haven't added any products yet. Use the form below to add new products.</td>`;
+                tableBody.appendChild(row);
+            } else {
+                // Display products if there are any
+                products.forEach(product => {
+                    const row = document.createElement('tr');
+                    row.dataset.productId = product.id;
+                    row.innerHTML = `
+                        <td>${product.id}</td>
+                        <td><img src="/images/${product.image}?w=128&format=webp" loading="lazy" alt="${product.name}" style="max-width: 100px;"/></td>
+                        <td>${product.name}</td>
+                        <td>${product.description}</td>
+                        <td>${product.price}</td>
+                        <td class="quantity">${product.quantity}</td>
+                        <td><button class="delete-product" data-id="${product.id}">Delete</button></td>
+                    `;
+                    tableBody.appendChild(row);
+                });
+
+                // Add event listener to delete buttons
+                document.querySelectorAll('.delete-product').forEach(button => {
+                    button.addEventListener('click', async (e) => {
+                        const productId = e.target.getAttribute('data-id');
+                        await deleteProduct(productId);
+                    });
+                });
+            }
+        } else {
+            console.log('No products found.');
+        }
+    } catch (error) {
+        console.log('Error fetching user products:', error);
+    }
+}
+
+// Live updates for this seller: quantities change in place, anything else reloads the table
+function subscribeToSellerEvents(userId, token) {
+    const source = new EventSource(`http://127.0.0.1:8000/events?topics=seller:${userId}`);
+    let connectedBefore = false;
+
+    source.onmessage = async (message) => {
+        const event = JSON.parse(message.data);
+
+        if (event.type === 'ready') {
+            // Events may have been missed while reconnecting
+            if (connectedBefore) {
+                await loadUserProducts(userId, token);
+            }
+            connectedBefore = true;
+        } else if (event.type === 'stock.changed') {
+            event.items.forEach(item => {
+                const cell = document.querySelector(`#user-product-table tr[data-product-id="${item.product_id}"] .quantity`);
+                if (cell) {
+                    cell.innerText = item.quantity;
+                }
+            });
+        } else {
+            await loadUserProducts(userId, token);
+        }
+    };
+}
+
 // Function to delete a product
 async function deleteProduct(productId) {
     const token = localStorage.getItem('Token');